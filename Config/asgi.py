@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Campaign progress is streamed as Server-Sent Events; everything else goes to Django.
+from campaigns.sse import CampaignProgressStream  # noqa: E402
+
+application = CampaignProgressStream(django_application)
@@ -15,9 +15,6 @@ ALLOWED_HOSTS = []
 # Add to your existing email settings
 SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000')
 
-# Email sending throttling (optional)
-
-
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -225,8 +222,10 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', True)
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'no-reply@codefyn.com')
-EMAIL_THROTTLE = int(os.getenv('EMAIL_THROTTLE', 10))  # Emails per second (0 for no limit)
 EMAIL_TIMEOUT = 30  # Increase timeout for bulk sending
+EMAIL_POOL_MAX_IDLE = 8  # Idle SMTP sessions kept open per worker process and account (>= delivery concurrency)
+EMAIL_DELIVERY_CONCURRENCY = int(os.getenv('EMAIL_DELIVERY_CONCURRENCY', 4))  # Concurrent SMTP sessions per worker (1 sends sequentially)
+EMAIL_POOL_HEALTHCHECK_AFTER = 30  # Seconds idle before a pooled session is checked with NOOP
 
 # Security settings (override in production)
 SESSION_COOKIE_SECURE = False
@@ -249,9 +248,71 @@ if 'sqlite' in DATABASES['default']['ENGINE']:
 CELERY_TASK_SOFT_TIME_LIMIT = 300  # 5 minutes
 CELERY_TASK_TIME_LIMIT = 600  # 10 minutes
 CELERY_TASK_ACKS_LATE = True  # Matches your acks_late=True
+
+# Caching
+# The default cache is shared by every web and worker process. The site settings version
+# stamp and the dashboard stats are invalidated on write, and every process must see that,
+# so a per-process cache (LocMemCache) will not do.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://localhost:6379/2'),
+    }
+}
+DASHBOARD_STATS_TTL = 60  # Seconds the per-owner dashboard tiles are cached (writes invalidate them sooner)
+QUILL_HTML_CACHE_SIZE = 256  # Rendered Quill documents kept per process (keyed by content hash)
+
 # Email sending configuration
 EMAIL_BATCH_SIZE = 50  # Number of emails per batch
-EMAIL_THROTTLE = 0.1  # Seconds between batches (0 for no delay)
+EMAIL_CHUNK_SIZE = 1000  # Subscribers per chunk task fanned out across workers
+EMAIL_CHUNK_LEASE_SECONDS = 300  # A chunk whose worker sent no heartbeat for this long is handed to another worker
+EMAIL_CHUNK_MAX_ATTEMPTS = 5  # Claims of a chunk before the reaper gives up on it
+
+# Open/click tracking: the endpoints only queue events, a beat task bulk-inserts them.
+# Without a Redis broker (or with eager tasks) events go to a local spool; run
+# `manage.py flush_tracking_events` from cron when no beat is running.
+TRACKING_EVENT_BUFFER = os.getenv('TRACKING_EVENT_BUFFER', 'redis')  # 'redis' or 'spool'
+TRACKING_SPOOL_DIR = os.path.join(BASE_DIR, 'spool', 'tracking')
+TRACKING_FLUSH_INTERVAL = 10  # Seconds between flushes
+TRACKING_FLUSH_BATCH = 5000  # Events read from the buffer per bulk insert
+TRACKING_FLUSH_MAX_ATTEMPTS = 3  # Failed saves of a batch before its events are saved one by one and bad ones dead-lettered
+
+# Subscriber imports: uploads are spooled to MEDIA_ROOT/imports/ and read by a Celery task
+# in chunks; the task hands over to a fresh one after IMPORT_TASK_TIME_BUDGET seconds.
+IMPORT_CHUNK_SIZE = 5000  # Rows read and written per chunk
+IMPORT_TASK_TIME_BUDGET = 240  # Seconds per task run, below CELERY_TASK_SOFT_TIME_LIMIT
+IMPORT_MAX_ERRORS = 1000  # Rejected rows kept on the job for the user to review
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched per round trip while streaming an export
+
+CELERY_BEAT_SCHEDULE = {
+    'requeue-stalled-campaign-chunks': {
+        'task': 'campaigns.tasks.requeue_stalled_chunks',
+        'schedule': 60.0,
+    },
+    'flush-tracking-events': {
+        'task': 'campaigns.tasks.flush_tracking_events',
+        'schedule': float(TRACKING_FLUSH_INTERVAL),
+    },
+}
+
+# Default outbound rate limits (keyed by EMAIL_HOST_USER, 0 for no limit). Providers set
+# up in core.SMTPSetting use their own rates and fall back to the "default" entry.
+# Token buckets live in the Redis broker so the limit holds across all workers.
+EMAIL_RATE_LIMITS = {
+    'default': {
+        'per_second': int(os.getenv('EMAIL_RATE_PER_SECOND', 10)),
+        'per_day': int(os.getenv('EMAIL_RATE_PER_DAY', 0)),
+    },
+}
+EMAIL_RATE_LIMIT_BACKEND = os.getenv('EMAIL_RATE_LIMIT_BACKEND', 'redis')  # 'redis' or 'local'
+EMAIL_RATE_LIMIT_HEADROOM = 0.95  # Run at 95% of the quota
+EMAIL_RATE_LIMIT_MAX_WAIT = 60  # Seconds to block before rescheduling the chunk instead
+
+# Routing across the SMTP providers configured in core.SMTPSetting
+EMAIL_PROVIDER_REFRESH = 60  # Seconds between reloads of the provider list in each worker
+EMAIL_PROVIDER_FAILURE_THRESHOLD = 3  # Failed submissions in a row before a provider is paused
+EMAIL_PROVIDER_COOLDOWN = 120  # Seconds a failing provider gets no traffic
+EMAIL_PROVIDER_SLOW_SECONDS = 2  # Per-message latency above which a provider's weight is scaled down
 
 # Logging configuration
 import os
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Campaign, EmailTemplate, Plugin,CampaignAnalytics,SubscriberList
+from .models import Campaign, EmailTemplate, Plugin,CampaignAnalytics,SubscriberList,CampaignRecipient,CampaignChunk,CampaignLink,CampaignHourlyStats,CampaignUniqueSketch
 from django.utils.translation import gettext_lazy as _
+from subscribers.search import matching_subscribers
 
 
 
@@ -8,10 +9,18 @@ from django.utils.translation import gettext_lazy as _
 class CampaignAnalyticsAdmin(admin.ModelAdmin):
     list_display = ('campaign', 'subscriber', 'event_type', 'event_time', 'ip_address')
     list_filter = ('event_type', 'event_time')
-    search_fields = ('campaign__name', 'subscriber__email', 'ip_address', 'clicked_url')
+    search_fields = ('campaign__name', 'ip_address', 'clicked_url')
     readonly_fields = ('event_time',)
     ordering = ('-event_time',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Subscribers are matched through their search index rather than a
+        # LIKE '%term%' join on subscriber__email.
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term.strip():
+            results |= queryset.filter(subscriber_id__in=matching_subscribers(search_term))
+        return results, may_have_duplicates
+
     fieldsets = (
         (None, {
             'fields': ('campaign', 'subscriber', 'event_type', 'event_time')
@@ -23,6 +32,46 @@ class CampaignAnalyticsAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(CampaignRecipient)
+class CampaignRecipientAdmin(admin.ModelAdmin):
+    list_display = ('campaign', 'subscriber', 'state', 'attempts', 'last_smtp_code', 'updated_at')
+    list_filter = ('state',)
+    raw_id_fields = ('campaign', 'subscriber')
+    readonly_fields = ('queued_at', 'updated_at', 'sent_at')
+    ordering = ('-updated_at',)
+
+
+@admin.register(CampaignChunk)
+class CampaignChunkAdmin(admin.ModelAdmin):
+    list_display = ('campaign', 'after_id', 'upto_id', 'checkpoint_id', 'status', 'attempts', 'lease_owner', 'heartbeat_at')
+    list_filter = ('status',)
+    raw_id_fields = ('campaign',)
+    readonly_fields = ('created_at', 'finished_at')
+
+
+@admin.register(CampaignLink)
+class CampaignLinkAdmin(admin.ModelAdmin):
+    list_display = ('id', 'campaign', 'url', 'position', 'clicks', 'created_at')
+    search_fields = ('url', 'campaign__name')
+    raw_id_fields = ('campaign',)
+
+
+@admin.register(CampaignHourlyStats)
+class CampaignHourlyStatsAdmin(admin.ModelAdmin):
+    list_display = ('campaign', 'hour', 'event_type', 'count')
+    list_filter = ('event_type',)
+    raw_id_fields = ('campaign',)
+    ordering = ('-hour',)
+
+
+@admin.register(CampaignUniqueSketch)
+class CampaignUniqueSketchAdmin(admin.ModelAdmin):
+    list_display = ('campaign', 'event_type', 'estimate', 'updated_at')
+    list_filter = ('event_type',)
+    raw_id_fields = ('campaign',)
+    exclude = ('registers',)
+
+
 @admin.register(Campaign)
 class CampaignAdmin(admin.ModelAdmin):
     list_display = (
@@ -44,7 +93,7 @@ class CampaignAdmin(admin.ModelAdmin):
             'fields': ('name', 'subject', 'preview_text', 'content', 'template', 'list', 'owner')
         }),
         (_('Sending Details'), {
-            'fields': ('status', 'sent_at', 'task_id', 'sent_count', 'error_count', 'open_count', 'click_count', 'bounce_count', 'unsubscribe_count'),
+            'fields': ('status', 'sent_at', 'task_id', 'delivery_concurrency', 'sent_count', 'error_count', 'open_count', 'click_count', 'bounce_count', 'unsubscribe_count'),
             'classes': ('collapse',)
         }),
         (_('Timestamps'), {
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CampaignsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'campaigns'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from utils.quill import invalidate_quill_html
+        from .models import Campaign, EmailTemplate
+
+        for model in (Campaign, EmailTemplate):
+            post_save.connect(invalidate_quill_html, sender=model, dispatch_uid=f'quill_html_{model.__name__}_save')
+            post_delete.connect(invalidate_quill_html, sender=model, dispatch_uid=f'quill_html_{model.__name__}_delete')
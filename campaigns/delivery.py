@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .smtp_pool import pool as smtp_pool
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDeliveryEngine:
+    """
+    Deliver pre-rendered messages over ``concurrency`` SMTP sessions at once.
+
+    The batch is split into one contiguous slice per session, and each
+    session submits its slice with a single ``smtp_pool.deliver`` call on a
+    pooled connection, so the sessions keep several SMTP round trips in
+    flight while each still sends its share in one ``send_messages``. The
+    blocking smtplib calls run on a thread per session, driven from the
+    event loop.
+
+    Has the same contract as ``smtp_pool.deliver``: returns a
+    ``DeliveryResult`` per message, in order, with ``None`` for messages
+    that were never attempted. A session that fails leaves only its own
+    slice unattempted; the other sessions carry on.
+    """
+
+    def __init__(self, concurrency, **connection_kwargs):
+        self.concurrency = max(1, concurrency)
+        self.connection_kwargs = connection_kwargs
+
+    def deliver(self, messages):
+        if not messages:
+            return []
+        return asyncio.run(self._deliver(messages))
+
+    async def _deliver(self, messages):
+        results = [None] * len(messages)
+        size = -(-len(messages) // min(self.concurrency, len(messages)))
+        slices = [(start, messages[start:start + size]) for start in range(0, len(messages), size)]
+        with ThreadPoolExecutor(max_workers=len(slices), thread_name_prefix='smtp-session') as executor:
+            await asyncio.gather(*(self._session(executor, start, part, results) for start, part in slices))
+        return results
+
+    async def _session(self, executor, start, messages, results):
+        loop = asyncio.get_running_loop()
+        deliver = partial(smtp_pool.deliver, messages, **self.connection_kwargs)
+        try:
+            delivered = await loop.run_in_executor(executor, deliver)
+        except Exception as e:
+            # The session could not be opened, so none of its slice was
+            # attempted; it stays unattempted and can go elsewhere.
+            logger.error(f"SMTP session failed; leaving {len(messages)} messages unattempted: {str(e)}")
+            return
+        results[start:start + len(delivered)] = delivered
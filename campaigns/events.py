@@ -0,0 +1,328 @@
+import fcntl
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+EVENTS_KEY = 'campaign-events'
+INFLIGHT_KEY = 'campaign-events:flushing'
+ATTEMPTS_KEY = 'campaign-events:flushing:attempts'
+DEAD_LETTER_KEY = 'campaign-events:dead'
+LOCK_KEY = 'campaign-events:flush-lock'
+
+# Move up to ARGV[1] events from the queue to the in-flight list and return
+# them, so a flusher that dies mid-way leaves its batch for the next one.
+TAKE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items == 0 then
+    return items
+end
+redis.call('LTRIM', KEYS[1], #items, -1)
+for i = 1, #items, 1000 do
+    redis.call('RPUSH', KEYS[2], unpack(items, i, math.min(i + 999, #items)))
+end
+return items
+"""
+
+# Seconds a rotated spool file is left alone before it is read, so writers
+# that opened it just before the rotation have finished their append.
+SPOOL_GRACE_SECONDS = 2
+
+
+class RedisEventBuffer:
+    """Tracking events queued in a list on the Celery Redis broker."""
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    def append(self, *lines):
+        self._client.rpush(EVENTS_KEY, *lines)
+
+    @contextmanager
+    def lock(self):
+        lock = self._client.lock(LOCK_KEY, timeout=settings.CELERY_TASK_TIME_LIMIT)
+        acquired = lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+
+    def take(self, limit):
+        """Lines of the next batch; a batch left over by a crashed flush comes first."""
+        leftover = self._client.lrange(INFLIGHT_KEY, 0, -1)
+        if leftover:
+            return leftover
+        return self._take(keys=[EVENTS_KEY, INFLIGHT_KEY], args=[limit])
+
+    def fail(self):
+        """Count a failed save of the in-flight batch; returns the failures so far."""
+        return self._client.incr(ATTEMPTS_KEY)
+
+    def dead_letter(self, lines):
+        self._client.rpush(DEAD_LETTER_KEY, *lines)
+
+    def commit(self):
+        self._client.delete(INFLIGHT_KEY, ATTEMPTS_KEY)
+
+
+class SpoolEventBuffer:
+    """
+    Tracking events appended to a local JSONL file, for running without
+    Redis. Each event is a single ``O_APPEND`` write. The flusher renames
+    the file aside and reads it once no writer can still be appending.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, 'events.jsonl')
+        self.dead_letter_path = os.path.join(directory, 'dead.jsonl')
+        self._current = None
+        self._rotated_this_flush = False
+
+    def append(self, *lines):
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, ''.join(f"{line}\n" for line in lines).encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.flush.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            self._rotated_this_flush = False
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rotated(self):
+        names = [name for name in os.listdir(self.directory) if name.endswith('.flushing')]
+        return sorted(names, key=lambda name: int(name.split('.')[1]))
+
+    def take(self, limit):
+        """
+        Lines of the oldest rotated file, rotating the live file (once per
+        flush) when none is waiting.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        rotated = self._rotated()
+        if not rotated and not self._rotated_this_flush and os.path.exists(self.path) and os.path.getsize(self.path):
+            self._rotated_this_flush = True
+            os.replace(self.path, os.path.join(self.directory, f"events.{time.time_ns()}.flushing"))
+            rotated = self._rotated()
+        if not rotated:
+            return []
+
+        name = rotated[0]
+        rotated_at = int(name.split('.')[1]) / 1e9
+        wait = SPOOL_GRACE_SECONDS - (time.time() - rotated_at)
+        if wait > 0:
+            time.sleep(wait)
+        self._current = os.path.join(self.directory, name)
+        with open(self._current, 'rb') as spool:
+            return spool.read().splitlines()
+
+    def fail(self):
+        """Count a failed save of the current file; returns the failures so far."""
+        attempts_path = f"{self._current}.attempts"
+        try:
+            with open(attempts_path) as attempts_file:
+                attempts = int(attempts_file.read() or 0) + 1
+        except (FileNotFoundError, ValueError):
+            attempts = 1
+        with open(attempts_path, 'w') as attempts_file:
+            attempts_file.write(str(attempts))
+        return attempts
+
+    def dead_letter(self, lines):
+        with open(self.dead_letter_path, 'ab') as dead:
+            dead.write(b''.join(line + b'\n' for line in lines))
+
+    def commit(self):
+        if self._current:
+            os.remove(self._current)
+            if os.path.exists(f"{self._current}.attempts"):
+                os.remove(f"{self._current}.attempts")
+            self._current = None
+
+
+_buffer = None
+_spool = None
+
+
+def get_spool_buffer():
+    global _spool
+    if _spool is None:
+        _spool = SpoolEventBuffer(settings.TRACKING_SPOOL_DIR)
+    return _spool
+
+
+def get_event_buffer():
+    global _buffer
+    if _buffer is None:
+        use_redis = (
+            settings.TRACKING_EVENT_BUFFER == 'redis'
+            and settings.CELERY_BROKER_URL.startswith(('redis://', 'rediss://'))
+            and not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False)
+        )
+        _buffer = RedisEventBuffer(settings.CELERY_BROKER_URL) if use_redis else get_spool_buffer()
+    return _buffer
+
+
+def _append(lines):
+    buffer = get_event_buffer()
+    try:
+        buffer.append(*lines)
+    except Exception as e:
+        if isinstance(buffer, SpoolEventBuffer):
+            logger.error(f"Could not record {len(lines)} tracking events: {str(e)}")
+            return
+        logger.error(f"Event buffer unavailable, spooling locally: {str(e)}")
+        get_spool_buffer().append(*lines)
+
+
+def _event_line(campaign_id, subscriber_id, event_type, request=None, clicked_url=None):
+    return json.dumps({
+        'campaign_id': str(campaign_id),
+        'subscriber_id': str(subscriber_id),
+        'event_type': event_type,
+        'event_time': timezone.now().isoformat(),
+        'ip_address': request.META.get('REMOTE_ADDR') if request else None,
+        'user_agent': request.META.get('HTTP_USER_AGENT') if request else None,
+        'clicked_url': clicked_url,
+    }, separators=(',', ':'))
+
+
+def record_event(campaign_id, subscriber_id, event_type, request=None, clicked_url=None):
+    """
+    Queue a tracking event for the next flush instead of writing it to the
+    database in the request. Falls back to the local spool if Redis is down.
+    """
+    _append([_event_line(campaign_id, subscriber_id, event_type, request, clicked_url)])
+
+
+def record_events(campaign_id, subscriber_ids, event_type):
+    """Queue one event per subscriber with a single buffer write."""
+    if subscriber_ids:
+        _append([_event_line(campaign_id, subscriber_id, event_type) for subscriber_id in subscriber_ids])
+
+
+def _parse(lines):
+    events = []
+    for line in lines:
+        try:
+            event = json.loads(line)
+            event['event_time'] = parse_datetime(event['event_time'])
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Dropping malformed tracking event: {line!r}")
+            continue
+        events.append(event)
+    return events
+
+
+def save_events(events):
+    """
+    ``bulk_create`` a batch of queued events as ``CampaignAnalytics`` rows
+    and fold them into the hourly rollup, the unique-subscriber sketches and
+    the campaign engagement counters in the same transaction. Events for
+    campaigns or subscribers deleted in the meantime are dropped. Returns
+    the rows created.
+    """
+    from subscribers.models import Subscriber
+    from .models import Campaign, CampaignAnalytics, CampaignHourlyStats, CampaignUniqueSketch
+
+    campaign_ids = {event['campaign_id'] for event in events}
+    subscriber_ids = {event['subscriber_id'] for event in events}
+    known_campaigns = {str(pk) for pk in Campaign.objects.filter(pk__in=campaign_ids).values_list('pk', flat=True)}
+    known_subscribers = {str(pk) for pk in Subscriber.objects.filter(pk__in=subscriber_ids).values_list('pk', flat=True)}
+
+    rows = [
+        CampaignAnalytics(
+            campaign_id=event['campaign_id'],
+            subscriber_id=event['subscriber_id'],
+            event_type=event['event_type'],
+            event_time=event['event_time'],
+            ip_address=event.get('ip_address'),
+            user_agent=event.get('user_agent'),
+            clicked_url=event.get('clicked_url'),
+        )
+        for event in events
+        if event['campaign_id'] in known_campaigns and event['subscriber_id'] in known_subscribers
+    ]
+    with transaction.atomic():
+        CampaignAnalytics.objects.bulk_create(rows, batch_size=1000)
+        CampaignHourlyStats.record_events(rows)
+        CampaignUniqueSketch.record_events(rows)
+        Campaign.record_engagement(rows)
+    return rows
+
+
+def _save_each(lines):
+    """Save events one at a time; returns the lines that still fail."""
+    failed = []
+    for line in lines:
+        try:
+            save_events(_parse([line]))
+        except Exception as e:
+            logger.error(f"Dead-lettering tracking event {line!r}: {str(e)}")
+            failed.append(line)
+    return failed
+
+
+def flush_buffer(buffer, batch_size=None):
+    """
+    Drain ``buffer`` into the database. Returns the number of events read.
+
+    A batch that fails to save stays in the buffer and is tried again on
+    the next flush. After ``TRACKING_FLUSH_MAX_ATTEMPTS`` failures it is
+    saved event by event, and the events that still fail go to the dead
+    letter list, so one bad event cannot hold up the rest.
+    """
+    batch_size = batch_size or settings.TRACKING_FLUSH_BATCH
+    total = 0
+    with buffer.lock() as acquired:
+        if not acquired:
+            return 0
+        while True:
+            lines = buffer.take(batch_size)
+            if not lines:
+                break
+            try:
+                save_events(_parse(lines))
+            except Exception:
+                if buffer.fail() < settings.TRACKING_FLUSH_MAX_ATTEMPTS:
+                    raise
+                failed = _save_each(lines)
+                if failed:
+                    buffer.dead_letter(failed)
+            buffer.commit()
+            total += len(lines)
+    return total
+
+
+def flush_events():
+    """Flush the configured buffer and anything spooled locally while Redis was down."""
+    buffers = [get_event_buffer()]
+    if not isinstance(buffers[0], SpoolEventBuffer):
+        buffers.append(get_spool_buffer())
+    return sum(flush_buffer(buffer) for buffer in buffers)
@@ -9,7 +9,7 @@ class CampaignForm(forms.ModelForm):
 
     class Meta:
         model = Campaign
-        fields = ['name', 'subject', 'preview_text', 'content', 'is_active', 'list' ,'template']
+        fields = ['name', 'subject', 'preview_text', 'content', 'is_active', 'list' ,'template', 'delivery_concurrency']
 
 class EmailTemplateForm(forms.ModelForm):
     content = QuillFormField()
@@ -0,0 +1,110 @@
+import re
+from html import unescape
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.html import escape
+
+HREF_RE = re.compile(r'''\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''', re.IGNORECASE)
+
+TRACKABLE_SCHEMES = ('http://', 'https://')
+
+
+class _AnchorFinder(HTMLParser):
+    """Collect the source offset and text of every ``<a>`` start tag."""
+
+    def __init__(self, html):
+        super().__init__(convert_charrefs=True)
+        self.anchors = []
+        self._line_starts = [0]
+        for match in re.finditer('\n', html):
+            self._line_starts.append(match.end())
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            line, column = self.getpos()
+            self.anchors.append((self._line_starts[line - 1] + column, self.get_starttag_text()))
+
+    handle_startendtag = handle_starttag
+
+
+def find_links(html):
+    """
+    Return ``[(start, end, url), ...]`` for the href value of every anchor
+    pointing at an http(s) URL, with offsets into ``html``.
+    """
+    finder = _AnchorFinder(html)
+    finder.feed(html)
+    finder.close()
+
+    links = []
+    for tag_start, tag_text in finder.anchors:
+        match = HREF_RE.search(tag_text)
+        if not match:
+            continue
+        group = next(index for index in (1, 2, 3) if match.group(index) is not None)
+        url = unescape(match.group(group)).strip()
+        if not url.lower().startswith(TRACKABLE_SCHEMES):
+            continue
+        links.append((tag_start + match.start(group), tag_start + match.end(group), url))
+    return links
+
+
+def get_tracked_url_affixes():
+    """``(prefix, infix, suffix)`` of a tracked link URL, around the link id and subscriber id."""
+    url = reverse('campaign:track_link', args=[4242, '00000000-0000-0000-0000-000000000000'])
+    prefix, rest = url.split('4242', 1)
+    infix, suffix = rest.split('00000000-0000-0000-0000-000000000000', 1)
+    return f"{settings.SITE_URL}{prefix}", infix, suffix
+
+
+def get_open_url_affixes(campaign_id):
+    """``(prefix, suffix)`` of a campaign's open-tracking pixel URL, around the subscriber id."""
+    url = reverse('campaign:track_open', args=[campaign_id, '00000000-0000-0000-0000-000000000000'])
+    prefix, suffix = url.split('00000000-0000-0000-0000-000000000000', 1)
+    return f"{settings.SITE_URL}{prefix}", suffix
+
+
+class LinkRewriter:
+    """
+    Rewrites a campaign's HTML so every outbound link goes through click
+    tracking.
+
+    The HTML is parsed once; each distinct URL is registered as a
+    ``CampaignLink`` and its hrefs are replaced by a tracked URL. The result
+    is kept as literal strings with the subscriber id between them, so each
+    recipient's body only costs a join.
+    """
+
+    def __init__(self, campaign, html):
+        from .models import CampaignLink
+
+        links = find_links(html)
+        link_ids = CampaignLink.register(campaign, [url for _, _, url in links])
+        prefix, infix, suffix = get_tracked_url_affixes()
+
+        self.parts = []
+        position = 0
+        for start, end, url in links:
+            self.parts.append(html[position:start] + escape(f"{prefix}{link_ids[url]}{infix}"))
+            self.parts.append(None)
+            position = end
+            self.parts.append(escape(suffix))
+        self.parts.append(html[position:])
+        self.parts = self._merge(self.parts)
+
+    @staticmethod
+    def _merge(parts):
+        merged = []
+        for part in parts:
+            if part is not None and merged and merged[-1] is not None:
+                merged[-1] += part
+            else:
+                merged.append(part)
+        return merged
+
+    def render(self, subscriber_id):
+        """The campaign HTML with tracked links for one subscriber (``None`` parts are the slots)."""
+        subscriber_id = str(subscriber_id)
+        return ''.join(subscriber_id if part is None else part for part in self.parts)
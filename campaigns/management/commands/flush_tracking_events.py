@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from campaigns.events import flush_events
+
+
+class Command(BaseCommand):
+    help = "Write buffered open/click tracking events to the database (for setups without Celery beat)."
+
+    def handle(self, *args, **options):
+        flushed = flush_events()
+        self.stdout.write(f"Flushed {flushed} tracking events")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from campaigns.models import Campaign, CampaignHourlyStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly analytics rollup and link click counts from the raw tracking events."
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_ids', nargs='*', help="Campaigns to rebuild (default: all)")
+
+    def handle(self, *args, **options):
+        campaigns = Campaign.objects.all()
+        if options['campaign_ids']:
+            campaigns = campaigns.filter(pk__in=options['campaign_ids'])
+        for campaign in campaigns.iterator():
+            CampaignHourlyStats.rebuild(campaign)
+            self.stdout.write(f"Rebuilt stats for {campaign.name} ({campaign.pk})")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from campaigns.models import Campaign, CampaignUniqueSketch
+
+
+class Command(BaseCommand):
+    help = (
+        "Count unique opens and clicks exactly from the raw tracking events, "
+        "compare them with the sketch estimates and rebuild the sketches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_ids', nargs='*', help="Campaigns to recount (default: all)")
+        parser.add_argument('--dry-run', action='store_true', help="Report the counts without rebuilding the sketches")
+
+    def handle(self, *args, **options):
+        campaigns = Campaign.objects.all()
+        if options['campaign_ids']:
+            campaigns = campaigns.filter(pk__in=options['campaign_ids'])
+
+        for campaign in campaigns.iterator():
+            estimates = CampaignUniqueSketch.estimates(campaign)
+            if options['dry_run']:
+                exact = {
+                    event_type: campaign.analytics.filter(event_type=event_type).values('subscriber_id').distinct().count()
+                    for event_type in CampaignUniqueSketch.TRACKED_EVENTS
+                }
+            else:
+                exact = CampaignUniqueSketch.rebuild(campaign)
+
+            for event_type in CampaignUniqueSketch.TRACKED_EVENTS:
+                error = (estimates[event_type] - exact[event_type]) / exact[event_type] * 100 if exact[event_type] else 0
+                self.stdout.write(
+                    f"{campaign.name} ({campaign.pk}) unique {event_type}: "
+                    f"exact {exact[event_type]}, sketch {estimates[event_type]} ({error:+.2f}%)"
+                )
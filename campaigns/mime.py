@@ -0,0 +1,197 @@
+import logging
+import uuid
+from email.policy import compat32
+from email.utils import formatdate, make_msgid
+
+from django.conf import settings
+from django.core.mail.message import RFC5322_EMAIL_LINE_LENGTH_LIMIT
+from django.core.mail.utils import DNS_NAME
+
+logger = logging.getLogger(__name__)
+
+# Per-recipient header lines; the body slots come from CampaignRenderer.
+HEADER_SLOTS = {
+    'to': 'To',
+    'date': 'Date',
+    'message_id': 'Message-ID',
+    'list_unsubscribe': 'List-Unsubscribe',
+}
+
+# Django messages use the compat32 policy; the SMTP backend serializes with CRLF.
+_policy = compat32.clone(linesep='\r\n')
+
+
+def _header_line(name, value):
+    """Serialize one header the way the email generator would, folding included."""
+    if len(name) + len(value) + 2 <= _policy.max_line_length and value.isascii():
+        return f"{name}: {value}\r\n".encode('ascii')
+    return _policy.fold_binary(name, value)
+
+
+class PreparedEmail:
+    """
+    Message whose MIME bytes are already assembled. Has just enough of the
+    ``EmailMessage`` interface for the SMTP backend's ``send_messages``,
+    which hands ``as_bytes()`` straight to ``smtplib.sendmail``.
+    """
+
+    encoding = None
+
+    def __init__(self, from_email, to, data):
+        self.from_email = from_email
+        self.to = [to]
+        self._data = data
+
+    def recipients(self):
+        return self.to
+
+    def message(self):
+        return self
+
+    def as_bytes(self, linesep='\n'):
+        return self._data
+
+
+class MIMESkeleton:
+    """
+    The serialized MIME message of a campaign, built once per sender
+    address, with the per-recipient values kept as slots between byte
+    spans.
+
+    The skeleton is a Django ``EmailMultiAlternatives`` rendered with marker
+    strings for the recipient, Date, Message-ID, List-Unsubscribe and the
+    renderer's body slots, serialized exactly as the SMTP backend would send
+    it and split on the markers. Per-recipient headers are whole-line slots
+    so they can be folded for their real length. Building a message is
+    then one ``b''.join`` of the spans and the encoded slot values.
+
+    Only plain 7bit/8bit bodies can be spliced like this. If the campaign's
+    body needs quoted-printable or base64, the skeleton is not used. A
+    recipient whose values would change the encoding (non-ASCII in a 7bit
+    body, or a line past the RFC 5322 limit) gets ``None`` from ``build``
+    and is sent through Django instead. ``verify()`` checks the first
+    message against Django's own output and turns the skeleton off on any
+    difference.
+    """
+
+    def __init__(self, campaign, renderer, from_email):
+        self.campaign = campaign
+        self.renderer = renderer
+        self.from_email = from_email
+        self.enabled = renderer.enabled
+        self.verified = False
+        self.seven_bit = True
+        self.head_parts = self.body_parts = ()
+        if self.enabled:
+            self._build()
+
+    def _build(self):
+        token = uuid.uuid4().hex
+        header_markers = {slot: f"SLOT{token}{slot.upper()}X" for slot in HEADER_SLOTS}
+        body_markers = self.renderer._markers
+
+        message = self.campaign._build_email_message(
+            email=header_markers['to'],
+            subject=self.campaign.subject,
+            html_content=self.renderer._join(self.renderer.html_parts, body_markers),
+            text_content=self.renderer._join(self.renderer.text_parts, body_markers),
+            unsubscribe_url=header_markers['list_unsubscribe'],
+            from_email=self.from_email
+        ).message()
+        message.replace_header('List-Unsubscribe', header_markers['list_unsubscribe'])
+        message.replace_header('Date', header_markers['date'])
+        message.replace_header('Message-ID', header_markers['message_id'])
+
+        encodings = {part.get('Content-Transfer-Encoding') for part in message.get_payload()}
+        if not encodings <= {'7bit', '8bit'}:
+            logger.info(f"Campaign {self.campaign.id} body needs {encodings}; not using the MIME skeleton")
+            self.enabled = False
+            return
+
+        self.seven_bit = '7bit' in encodings
+        data = message.as_bytes(linesep='\r\n')
+        self.boundary = message.get_boundary()
+        head, body = data.split(b'\r\n\r\n', 1)
+
+        header_lines = {
+            slot: f"{HEADER_SLOTS[slot]}: {marker}\r\n" for slot, marker in header_markers.items()
+        }
+        self.head_parts = self._split(head + b'\r\n\r\n', header_lines)
+        self.body_parts = self._split(body, body_markers)
+        self.max_literal_line = max(len(line) for line in body.split(b'\r\n'))
+
+    @staticmethod
+    def _split(data, markers):
+        parts = [data]
+        for name, marker in markers.items():
+            marker = marker.encode('ascii')
+            split_parts = []
+            for part in parts:
+                if isinstance(part, str) or marker not in part:
+                    split_parts.append(part)
+                    continue
+                for index, piece in enumerate(part.split(marker)):
+                    if index:
+                        split_parts.append(name)
+                    split_parts.append(piece)
+            parts = split_parts
+        # Slot names are str, literal spans are bytes.
+        return [part for part in parts if part != b'']
+
+    @staticmethod
+    def _join(parts, values):
+        return b''.join(values[part] if isinstance(part, str) else part for part in parts)
+
+    def build(self, subscriber, unsubscribe_url, date=None, message_id=None):
+        """Return a ``PreparedEmail`` for the recipient, or ``None`` to send through Django."""
+        body_values = self.renderer._slot_values(subscriber, unsubscribe_url)
+        if self.seven_bit and not all(value.isascii() for value in body_values.values()):
+            return None
+        if not subscriber.email.isascii():
+            return None
+
+        body_values = {name: value.encode('utf-8') for name, value in body_values.items()}
+        body = self._join(self.body_parts, body_values)
+        if self.max_literal_line + sum(map(len, body_values.values())) > RFC5322_EMAIL_LINE_LENGTH_LIMIT:
+            if any(len(line) > RFC5322_EMAIL_LINE_LENGTH_LIMIT for line in body.split(b'\r\n')):
+                return None
+
+        head = self._join(self.head_parts, {
+            'to': _header_line('To', subscriber.email),
+            'date': _header_line('Date', date or formatdate(localtime=settings.EMAIL_USE_LOCALTIME)),
+            'message_id': _header_line('Message-ID', message_id or make_msgid(domain=DNS_NAME)),
+            'list_unsubscribe': _header_line('List-Unsubscribe', f"<{unsubscribe_url}>"),
+        })
+        return PreparedEmail(self.from_email, subscriber.email, head + body)
+
+    def verify(self, subscriber, unsubscribe_url):
+        """Check the skeleton output matches Django's serialization byte for byte."""
+        self.verified = True
+        date = formatdate(localtime=settings.EMAIL_USE_LOCALTIME)
+        message_id = make_msgid(domain=DNS_NAME)
+        prepared = self.build(subscriber, unsubscribe_url, date=date, message_id=message_id)
+        if prepared is None:
+            self.verified = False
+            return True
+
+        html, text = self.renderer.render_full(subscriber, unsubscribe_url)
+        expected = self.campaign._build_email_message(
+            email=subscriber.email,
+            subject=self.campaign.subject,
+            html_content=html,
+            text_content=text,
+            unsubscribe_url=unsubscribe_url,
+            from_email=self.from_email
+        ).message()
+        expected.replace_header('Date', date)
+        expected.replace_header('Message-ID', message_id)
+        expected.set_boundary(self.boundary)
+
+        if prepared.as_bytes() != expected.as_bytes(linesep='\r\n'):
+            self.enabled = False
+            logger.warning(
+                f"MIME skeleton mismatch for campaign {self.campaign.id}; "
+                f"falling back to Django email messages"
+            )
+            return False
+        return True
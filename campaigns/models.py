@@ -1,30 +1,35 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import TruncHour
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
 
 User = get_user_model()
-from django.core.mail import EmailMultiAlternatives,get_connection
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+from django.utils.module_loading import import_string
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
-import threading
 import logging
-import threading
-from django.core.signing import Signer
 from django.core.signing import TimestampSigner
 from subscribers.models import Subscriber,SubscriberList
-from django.template import TemplateDoesNotExist
+from subscribers.tokens import UnsubscribeTokenSigner
+from utils.quill import quill_html
+from .smtp_pool import DeliveryResult, pool as smtp_pool
+from .delivery import AsyncDeliveryEngine
+from .throttle import get_rate_limiter, RateLimitExceeded
+from .routing import get_router, ProvidersUnavailable
+from .sketch import HyperLogLog
+from .events import record_events
+from .progress import publish_totals
 logger = logging.getLogger(__name__)
-from celery.result import AsyncResult
-from django.utils import timezone
-from django.core.mail import send_mail
 import time
-import math
+from collections import Counter
+from functools import partial
+from datetime import timedelta, timezone as dt_timezone
 from urllib.parse import quote
-import base64
-from django.core.signing import TimestampSigner
 
 SENDING_STATUS = (
     ('pending', 'Pending'),
@@ -36,6 +41,15 @@ SENDING_STATUS = (
 from django_quill.fields import QuillField
 
 
+# Tracking event type -> Campaign counter it increments.
+ENGAGEMENT_COUNTERS = {
+    'opened': 'open_count',
+    'clicked': 'click_count',
+    'bounced': 'bounce_count',
+    'unsubscribed': 'unsubscribe_count',
+}
+
+
 class Campaign(models.Model):
     """
     Email campaign model with bulk sending capabilities
@@ -56,6 +70,12 @@ class Campaign(models.Model):
         choices=SENDING_STATUS,
         default='pending'
     )
+    recipient_total = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Recipients in the audience snapshot, counted once when sending starts."
+    )
     sent_count = models.PositiveIntegerField(default=0)
     error_count = models.PositiveIntegerField(default=0)
     open_count = models.PositiveIntegerField(default=0)
@@ -75,6 +95,11 @@ class Campaign(models.Model):
         on_delete=models.CASCADE,
         related_name='campaigns'
     )
+    delivery_concurrency = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="Concurrent SMTP sessions per worker for this campaign. Leave blank to use the site default."
+    )
 
 
     class Meta:
@@ -92,6 +117,53 @@ class Campaign(models.Model):
         """Return active subscribers from the list."""
         return self.list.subscribers.filter(is_active=True)
 
+    def _get_memberships(self):
+        return Subscriber.lists.through.objects.filter(subscriberlist_id=self.list_id)
+
+    def get_recipient_snapshot(self):
+        """
+        Snapshot marker for a send: the highest list-membership id right now.
+        Subscribers added to the list after the send starts are not included.
+        """
+        return self._get_memberships().aggregate(models.Max('id'))['id__max'] or 0
+
+    def get_recipient_chunks(self, snapshot_id, chunk_size):
+        """
+        Split the membership id range up to the snapshot into
+        ``(after_id, upto_id)`` keyset ranges of about ``chunk_size`` rows.
+        """
+        memberships = self._get_memberships().filter(id__lte=snapshot_id).order_by('id')
+        after_id = 0
+        while after_id < snapshot_id:
+            boundary = list(
+                memberships.filter(id__gt=after_id).values_list('id', flat=True)[chunk_size - 1:chunk_size]
+            )
+            upto_id = boundary[0] if boundary else snapshot_id
+            yield after_id, upto_id
+            after_id = upto_id
+
+    def iter_recipient_batches(self, snapshot_id, after_id=0, upto_id=None, batch_size=None):
+        """
+        Yield ``(last_membership_id, subscribers)`` pages of active recipients
+        using keyset pagination over the list membership table
+        (``id > last_id ORDER BY id LIMIT n``), so memory stays flat no
+        matter how big the list is.
+        """
+        batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+        upto_id = min(upto_id, snapshot_id) if upto_id is not None else snapshot_id
+        memberships = self._get_memberships().filter(
+            id__lte=upto_id,
+            subscriber__is_active=True
+        ).select_related('subscriber').order_by('id')
+
+        last_id = after_id
+        while True:
+            page = list(memberships.filter(id__gt=last_id)[:batch_size])
+            if not page:
+                return
+            last_id = page[-1].id
+            yield last_id, [membership.subscriber for membership in page]
+
     def send_test_email(self, to_email):
         try:
      
@@ -111,6 +183,10 @@ class Campaign(models.Model):
             logger.warning(f"Campaign {self.id} already sent")
             return False
 
+        if self.status == 'sending' and self.chunks.filter(status__in=['pending', 'running']).exists():
+            logger.warning(f"Campaign {self.id} is already being sent")
+            return False
+
         active_subscribers = self._get_active_subscribers()
         if not active_subscribers.exists():
             logger.warning(f"No active subscribers for campaign {self.id}.")
@@ -119,13 +195,15 @@ class Campaign(models.Model):
         try:
             from .tasks import send_bulk_emails
 
-            subscriber_ids = list(active_subscribers.values_list('id', flat=True))
-            task = send_bulk_emails.delay(self.id, subscriber_ids)
+            self.status = 'sending'
+            self.save(update_fields=['status', 'updated_at'])
+
+            task = send_bulk_emails.delay(self.id, self.get_recipient_snapshot())
 
+            # The coordinator and its chunk tasks own the status and counters
+            # from here on, so only record the task id.
             self.task_id = task.id
-            self.sent_count = active_subscribers.count()
-            self.status = 'sending'
-            self.save()
+            self.save(update_fields=['task_id'])
 
             logger.info(f"Started sending campaign {self.id} with task {task.id}")
             return True
@@ -151,20 +229,16 @@ class Campaign(models.Model):
             sent_count = 0
             logger.info(f"Starting live send for campaign {self.id} to {total} subscribers.")
 
-            subscriber_list = list(active_subscribers.values_list('id', flat=True))
+            batches = self.iter_recipient_batches(self.get_recipient_snapshot(), batch_size=batch_size)
 
-            for i in range(0, total, batch_size):
-                batch_ids = subscriber_list[i:i + batch_size]
+            for batch_number, (_, subscribers) in enumerate(batches, start=1):
                 try:
-                    self._process_batch(batch_ids)
-                    sent_count += len(batch_ids)
-                    logger.info(f"Batch {i // batch_size + 1} sent ({len(batch_ids)} emails).")
+                    sent_count += self._process_batch(subscribers)[0]
+                    logger.info(f"Batch {batch_number} sent ({len(subscribers)} emails).")
                 except Exception as e:
-                    logger.error(f"Batch {i // batch_size + 1} failed: {str(e)}")
+                    logger.error(f"Batch {batch_number} failed: {str(e)}")
                     continue
 
-                time.sleep(2)
-
             self.status = 'sent'
             self.sent_at = timezone.now()
             self.sent_count = sent_count
@@ -179,37 +253,73 @@ class Campaign(models.Model):
             self.save()
             return False
 
-    def _process_batch(self, subscriber_ids):
+    def _process_batch(self, subscribers):
+        """
+        Send one batch and record each recipient's outcome in the ledger.
+        Returns ``(sent, failed)``. Recipients already marked sent in the
+        ledger are skipped. Must not run inside a transaction: the outcomes
+        are committed as soon as delivery returns.
+        """
         try:
-            logger.info(f"Processing batch of {len(subscriber_ids)} subscribers for campaign {self.id}")
-
-            with get_connection() as connection:
-                subscribers = self.list.subscribers.filter(
-                    id__in=subscriber_ids,
-                    is_active=True
-                )
-
-                if not subscribers.exists():
-                    logger.warning(f"No active subscribers found in batch for {self.id}")
-                    return
-
-                for idx, subscriber in enumerate(subscribers, start=1):
-                    email = self._prepare_single_email(
-                        email=subscriber.email,
-                        context={'subscriber': subscriber}
-                    )
-                    if email:
-                        connection.send_messages([email])
-
-                self.sent_count += subscribers.count()
-                self.save(update_fields=['sent_count', 'updated_at'])
-
-                logger.info(f"Batch complete: Sent {subscribers.count()} emails for campaign {self.id}")
+            logger.info(f"Processing batch of {len(subscribers)} subscribers for campaign {self.id}")
+
+            if not subscribers:
+                logger.warning(f"No active subscribers found in batch for {self.id}")
+                return 0, 0
+
+            rows = CampaignRecipient.queue_batch(self, subscribers)
+            pending = [
+                subscriber for subscriber in subscribers
+                if rows[subscriber.id].state != CampaignRecipient.SENT
+            ]
+
+            results = {}
+            try:
+                unsubscribe_url_for = self._get_unsubscribe_url_builder()
+                unsubscribe_urls = {subscriber.id: unsubscribe_url_for(subscriber) for subscriber in pending}
+                self._route_and_deliver(pending, unsubscribe_urls, results)
+            finally:
+                # Whatever reached SMTP is recorded, even when the batch fails
+                # part way, and committed on its own so no later error can
+                # roll it back and have the mail sent again.
+                sent, failed = self._record_results(pending, rows, results)
+
+            logger.info(f"Batch complete: Sent {sent} emails for campaign {self.id} ({failed} failed)")
+            return sent, failed
 
         except Exception as e:
             logger.error(f"Error processing batch for campaign {self.id}: {str(e)}", exc_info=True)
             raise
 
+    def _record_results(self, pending, rows, results):
+        """Write the batch's outcomes to the ledger and the counters. Returns ``(sent, failed)``."""
+        with transaction.atomic():
+            sent, failed = CampaignRecipient.record_batch(
+                [rows[subscriber.id] for subscriber in pending],
+                [results.get(subscriber.id) for subscriber in pending]
+            )
+
+        with transaction.atomic():
+            # Chunks of one campaign run in parallel, so increment in the database.
+            Campaign.objects.filter(pk=self.pk).update(
+                sent_count=models.F('sent_count') + sent,
+                error_count=models.F('error_count') + failed,
+                updated_at=timezone.now()
+            )
+            CampaignHourlyStats.record(self.pk, 'sent', sent)
+
+            # 5xx rejections count as bounces; they reach the counters and
+            # reports through the tracking event flush once this commits.
+            bounced = [
+                subscriber.id for subscriber in pending
+                if results.get(subscriber.id) and results[subscriber.id].permanent
+            ]
+            if bounced:
+                transaction.on_commit(lambda: record_events(self.pk, bounced, 'bounced'))
+        self.sent_count += sent
+        self.error_count += failed
+        return sent, failed
+
     def _prepare_single_email(self, email, context=None, is_test=False):
         context = context or {}
         # Ensure Quill content is properly serialized
@@ -219,7 +329,7 @@ class Campaign(models.Model):
         
         context.update({
             'campaign': self,
-           'campaign_content_html': self.content.html,
+           'campaign_content_html': quill_html(self.content),
             'unsubscribe_url': self._get_unsubscribe_url(email),
             'is_test': is_test
         })
@@ -228,13 +338,135 @@ class Campaign(models.Model):
         html_content = render_to_string('campaigns/email_template.html', context)
         text_content = strip_tags(html_content)
 
+        return self._build_email_message(
+            email=email,
+            subject=subject,
+            html_content=html_content,
+            text_content=text_content,
+            unsubscribe_url=context['unsubscribe_url']
+        )
+
+    def _route_and_deliver(self, subscribers, unsubscribe_urls, results=None):
+        """
+        Spread the batch across the SMTP providers and deliver it. Returns
+        ``{subscriber_id: DeliveryResult}``, filled into ``results`` as each
+        provider's share comes back so the caller keeps them if a later
+        share raises.
+
+        Each provider's share is metered by that provider's own rate limit.
+        A share that a provider could not take (out of quota, or the
+        session failed before the messages were attempted) is handed to the
+        remaining providers. What no provider can take is marked deferred,
+        unless nothing was sent yet, in which case the batch is rescheduled.
+        """
+        router = get_router()
+        results = {} if results is None else results
+        excluded = set()
+        remaining = subscribers
+        while remaining:
+            try:
+                assignments = router.split(remaining, exclude=excluded)
+            except ProvidersUnavailable:
+                if not results:
+                    raise
+                logger.warning(f"No SMTP provider left for {len(remaining)} recipients of campaign {self.id}; deferring")
+                for subscriber in remaining:
+                    results[subscriber.id] = DeliveryResult(False, None, False)
+                break
+
+            remaining = []
+            for provider, group in assignments:
+                try:
+                    get_rate_limiter().acquire(provider.key, len(group), provider.limits)
+                except RateLimitExceeded as e:
+                    router.saturate(provider, e.wait)
+                    excluded.add(provider.key)
+                    remaining.extend(group)
+                    continue
+
+                messages = [
+                    self._build_bulk_message(subscriber, unsubscribe_urls[subscriber.id], provider.from_email)
+                    for subscriber in group
+                ]
+                unattempted = []
+                for subscriber, result in zip(group, self._deliver(messages, provider)):
+                    if result is None:
+                        unattempted.append(subscriber)
+                    else:
+                        results[subscriber.id] = result
+                if unattempted:
+                    excluded.add(provider.key)
+                    remaining.extend(unattempted)
+
+        return results
+
+    def _deliver(self, messages, provider):
+        router = get_router()
+        concurrency = self.get_delivery_concurrency()
+        started = time.monotonic()
+        try:
+            if concurrency > 1:
+                results = AsyncDeliveryEngine(concurrency, **provider.connection_kwargs).deliver(messages)
+            else:
+                # One submission per batch over a pooled, already authenticated session.
+                results = smtp_pool.deliver(messages, **provider.connection_kwargs)
+        except Exception as e:
+            logger.error(f"SMTP provider {provider.name} failed: {str(e)}")
+            results = [None] * len(messages)
+        router.report(provider, results, time.monotonic() - started)
+        return results
+
+    def _build_bulk_message(self, subscriber, unsubscribe_url, from_email):
+        """
+        Build one recipient's message for a bulk send: spliced from the
+        campaign's MIME skeleton when possible, otherwise a Django email
+        built from the rendered body.
+        """
+        renderer = self.get_renderer()
+        if not renderer.verified:
+            renderer.verify(subscriber, unsubscribe_url)
+
+        skeleton = self.get_mime_skeleton(from_email)
+        if skeleton is not None and skeleton.enabled and renderer.enabled:
+            if not skeleton.verified:
+                skeleton.verify(subscriber, unsubscribe_url)
+            message = skeleton.build(subscriber, unsubscribe_url) if skeleton.enabled else None
+            if message is not None:
+                return message
+
+        html_content, text_content = renderer.render(subscriber, unsubscribe_url)
+        return self._build_email_message(
+            email=subscriber.email,
+            subject=self.subject,
+            html_content=html_content,
+            text_content=text_content,
+            unsubscribe_url=unsubscribe_url,
+            from_email=from_email
+        )
+
+    def get_mime_skeleton(self, from_email):
+        """
+        Per-sender MIME skeleton used by bulk sends over SMTP, cached on the
+        instance like the renderer. Other email backends get ``None`` and
+        receive regular Django messages.
+        """
+        if not issubclass(import_string(settings.EMAIL_BACKEND), SMTPEmailBackend):
+            return None
+
+        skeletons = self.__dict__.setdefault('_mime_skeletons', {})
+        if from_email not in skeletons:
+            from .mime import MIMESkeleton
+            skeletons[from_email] = MIMESkeleton(self, self.get_renderer(), from_email)
+        return skeletons[from_email]
+
+    def _build_email_message(self, email, subject, html_content, text_content, unsubscribe_url, from_email=None):
         email_msg = EmailMultiAlternatives(
             subject=subject,
             body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
             to=[email],
             headers={
-                'List-Unsubscribe': f'<{context["unsubscribe_url"]}>',
+                'List-Unsubscribe': f'<{unsubscribe_url}>',
                 'X-Campaign-ID': str(self.id),
                 'Precedence': 'bulk'
             }
@@ -242,6 +474,20 @@ class Campaign(models.Model):
         email_msg.attach_alternative(html_content, "text/html")
         return email_msg
 
+    def get_delivery_concurrency(self):
+        return self.delivery_concurrency or settings.EMAIL_DELIVERY_CONCURRENCY
+
+    def get_renderer(self):
+        """
+        Per-campaign render cache used by bulk sends. Built on first use and
+        kept on the instance so every batch of a send reuses the skeleton.
+        """
+        renderer = getattr(self, '_renderer', None)
+        if renderer is None:
+            from .rendering import CampaignRenderer
+            renderer = self._renderer = CampaignRenderer(self)
+        return renderer
+
     def _get_unsubscribe_url(self, email):
         signer = TimestampSigner()
         signed_email = signer.sign(email)
@@ -255,11 +501,28 @@ class Campaign(models.Model):
         url = reverse('subscriber:unsubscribe', args=[encoded_email])
         return f"{settings.SITE_URL}{url}"
     
+    def _get_unsubscribe_url_builder(self):
+        """
+        Return ``subscriber -> unsubscribe URL`` for bulk sends. The URL
+        prefix is resolved once per campaign and the token signer (with its
+        derived key) once per call, so each recipient only costs one short
+        HMAC.
+        """
+        affixes = getattr(self, '_unsubscribe_affixes', None)
+        if affixes is None:
+            url = reverse('subscriber:unsubscribe_token', args=[self.id, 'TOKEN'])
+            prefix, suffix = url.split('TOKEN')
+            affixes = self._unsubscribe_affixes = (f"{settings.SITE_URL}{prefix}", suffix)
+
+        prefix, suffix = affixes
+        make_token = UnsubscribeTokenSigner(self.id).make_token
+        return lambda subscriber: f"{prefix}{make_token(subscriber.id)}{suffix}"
+
     def verify_email_backend(self):
         try:
-            connection = get_connection(fail_silently=False)
-            connection.open()
-            connection.close()
+            with smtp_pool.connection() as connection:
+                if not smtp_pool.is_alive(connection):
+                    raise ConnectionError("SMTP session did not answer NOOP")
             return True
         except Exception as e:
             logger.error(f"Email backend verification failed: {str(e)}")
@@ -280,9 +543,24 @@ class Campaign(models.Model):
             }
         ]
 
+    def get_delivery_counts(self):
+        """Recipient counts per ledger state, from one grouped query."""
+        counts = dict(
+            self.recipients.order_by().values_list('state').annotate(total=models.Count('id'))
+        )
+        return {
+            label.lower(): counts.get(state, 0)
+            for state, label in CampaignRecipient.STATE_CHOICES
+        }
+
     def get_recipient_count(self):
+        if self.recipient_total is not None:
+            return self.recipient_total
         return self._get_active_subscribers().count()
 
+    def count_snapshot_recipients(self, snapshot_id):
+        return self._get_memberships().filter(id__lte=snapshot_id, subscriber__is_active=True).count()
+
     def get_sending_rate(self):
         if self.status != 'sending' or self.sent_count == 0:
             return None
@@ -335,6 +613,7 @@ class Campaign(models.Model):
                 'recent_activity': self.get_recent_activity(),
                 'timestamp': timezone.now().isoformat(),
                 'sent_count': self.sent_count,  # Sent count
+                'error_count': self.error_count,  # Failed sends
                 'open_count': self.open_count,  # Open count
                 'click_count': self.click_count,  # Click count
                 'bounce_count': self.bounce_count,  # Bounce count
@@ -392,6 +671,24 @@ class Campaign(models.Model):
             self.content = self.template.content
         super().save(*args, **kwargs)
 
+    @classmethod
+    def record_engagement(cls, events):
+        """
+        Fold a batch of ``CampaignAnalytics`` rows into the engagement
+        counters: one ``F()`` update per campaign, however many events.
+        """
+        counts = {}
+        for event in events:
+            field = ENGAGEMENT_COUNTERS.get(event.event_type)
+            if field:
+                campaign_counts = counts.setdefault(str(event.campaign_id), Counter())
+                campaign_counts[field] += 1
+        for campaign_id in sorted(counts):
+            cls.objects.filter(pk=campaign_id).update(**{
+                field: models.F(field) + count for field, count in counts[campaign_id].items()
+            })
+            transaction.on_commit(partial(publish_totals, campaign_id, list(counts[campaign_id])))
+
     def get_rates(self):
         """Calculate all engagement rates"""
         total_sent = self.sent_count
@@ -400,14 +697,19 @@ class Campaign(models.Model):
                 'open_rate': 0,
                 'click_rate': 0,
                 'bounce_rate': 0,
-                'unsubscribe_rate': 0
+                'unsubscribe_rate': 0,
+                'unique_open_rate': 0,
+                'unique_click_rate': 0
             }
 
+        unique = CampaignUniqueSketch.estimates(self)
         return {
             'open_rate': round((self.open_count / total_sent) * 100, 1),
             'click_rate': round((self.click_count / total_sent) * 100, 1),
             'bounce_rate': round((self.bounce_count / total_sent) * 100, 1),
-            'unsubscribe_rate': round((self.unsubscribe_count / total_sent) * 100, 1)
+            'unsubscribe_rate': round((self.unsubscribe_count / total_sent) * 100, 1),
+            'unique_open_rate': round((unique['opened'] / total_sent) * 100, 1),
+            'unique_click_rate': round((unique['clicked'] / total_sent) * 100, 1)
         }
 
 class ActivityLog(models.Model):
@@ -419,6 +721,470 @@ class ActivityLog(models.Model):
         ordering = ['-created_at']
 
 
+class CampaignRecipient(models.Model):
+    """
+    Delivery ledger: one row per (campaign, subscriber) recording where that
+    recipient's message stands. Written per batch with bulk_create and
+    bulk_update.
+    """
+    QUEUED = 0
+    SENT = 1
+    DEFERRED = 2
+    FAILED = 3
+    SUPPRESSED = 4
+    STATE_CHOICES = (
+        (QUEUED, 'Queued'),
+        (SENT, 'Sent'),
+        (DEFERRED, 'Deferred'),
+        (FAILED, 'Failed'),
+        (SUPPRESSED, 'Suppressed'),
+    )
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='recipients')
+    subscriber = models.ForeignKey(Subscriber, on_delete=models.CASCADE, related_name='campaign_deliveries')
+    state = models.PositiveSmallIntegerField(choices=STATE_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_smtp_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    queued_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'subscriber'], name='unique_campaign_recipient'),
+        ]
+        indexes = [
+            models.Index(fields=['campaign', 'state']),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id} - {self.subscriber_id} - {self.get_state_display()}"
+
+    @classmethod
+    def queue_batch(cls, campaign, subscribers):
+        """Ensure a ledger row exists for every subscriber; return them by subscriber id."""
+        cls.objects.bulk_create(
+            [cls(campaign=campaign, subscriber=subscriber) for subscriber in subscribers],
+            ignore_conflicts=True
+        )
+        rows = cls.objects.filter(campaign=campaign, subscriber__in=subscribers)
+        return {row.subscriber_id: row for row in rows}
+
+    @classmethod
+    def record_batch(cls, rows, results):
+        """
+        Apply ``DeliveryResult``s to their ledger rows with one bulk_update.
+        A ``None`` result (never attempted) leaves the row untouched.
+        Returns ``(sent, failed)``.
+        """
+        now = timezone.now()
+        sent = failed = 0
+        updated = []
+        for row, result in zip(rows, results):
+            if result is None:
+                continue
+            row.attempts += 1
+            row.last_smtp_code = result.smtp_code
+            row.updated_at = now
+            if result.delivered:
+                row.state = cls.SENT
+                row.sent_at = now
+                sent += 1
+            else:
+                row.state = cls.FAILED if result.permanent else cls.DEFERRED
+                failed += 1
+            updated.append(row)
+
+        cls.objects.bulk_update(updated, ['state', 'attempts', 'last_smtp_code', 'updated_at', 'sent_at'])
+        return sent, failed
+
+
+class CampaignChunk(models.Model):
+    """
+    Durable checkpoint for one keyset chunk of a campaign send.
+
+    ``checkpoint_id`` is the last list membership id whose batch has been
+    committed, so a retried or redelivered chunk task resumes after it. A
+    worker holds the chunk through a lease that it renews before and after
+    every batch; once the lease expires another worker may claim the chunk
+    and carry on.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='chunks')
+    snapshot_id = models.BigIntegerField()
+    after_id = models.BigIntegerField()
+    upto_id = models.BigIntegerField()
+    checkpoint_id = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    lease_owner = models.CharField(max_length=255, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['campaign', 'after_id']
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'after_id'], name='unique_campaign_chunk'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id} ({self.after_id}, {self.upto_id}] - {self.status}"
+
+    @classmethod
+    def plan(cls, campaign, snapshot_id, chunk_size):
+        """
+        Create the chunk rows for a send, or return the existing ones if the
+        coordinator already planned this snapshot (e.g. it was redelivered).
+        """
+        chunks = list(cls.objects.filter(campaign=campaign, snapshot_id=snapshot_id))
+        if chunks:
+            return chunks, False
+
+        cls.objects.filter(campaign=campaign).delete()
+        cls.objects.bulk_create([
+            cls(campaign=campaign, snapshot_id=snapshot_id, after_id=after_id, upto_id=upto_id, checkpoint_id=after_id)
+            for after_id, upto_id in campaign.get_recipient_chunks(snapshot_id, chunk_size)
+        ])
+        return list(cls.objects.filter(campaign=campaign, snapshot_id=snapshot_id)), True
+
+    @classmethod
+    def claim(cls, chunk_id, owner):
+        """
+        Take the lease on a chunk if it is free, expired or already ours.
+        Returns the claimed chunk, or ``None`` if another worker holds it or
+        it is finished.
+        """
+        now = timezone.now()
+        claimed = cls.objects.filter(
+            models.Q(lease_owner=owner) | models.Q(lease_owner='') | models.Q(lease_expires_at__lt=now),
+            pk=chunk_id,
+            status__in=['pending', 'running'],
+        ).update(
+            status='running',
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=settings.EMAIL_CHUNK_LEASE_SECONDS),
+            heartbeat_at=now,
+            attempts=models.F('attempts') + 1,
+        )
+        return cls.objects.select_related('campaign').get(pk=chunk_id) if claimed else None
+
+    def renew(self, owner):
+        """Extend the lease before sending a batch. Returns ``False`` if it was lost to another worker."""
+        now = timezone.now()
+        return bool(CampaignChunk.objects.filter(pk=self.pk, lease_owner=owner).update(
+            lease_expires_at=now + timedelta(seconds=settings.EMAIL_CHUNK_LEASE_SECONDS),
+            heartbeat_at=now,
+        ))
+
+    def checkpoint(self, owner, last_id, sent, failed):
+        """
+        Record a finished batch, whose ledger rows are already committed,
+        and renew the lease. Returns ``False`` if the lease was lost to
+        another worker, in which case the caller stops; the counts are
+        still added, but the checkpoint is left to the new owner, which
+        skips the recipients the ledger shows as sent.
+        """
+        now = timezone.now()
+        updated = CampaignChunk.objects.filter(pk=self.pk, lease_owner=owner).update(
+            checkpoint_id=last_id,
+            sent_count=models.F('sent_count') + sent,
+            error_count=models.F('error_count') + failed,
+            lease_expires_at=now + timedelta(seconds=settings.EMAIL_CHUNK_LEASE_SECONDS),
+            heartbeat_at=now,
+        )
+        if not updated:
+            CampaignChunk.objects.filter(pk=self.pk).update(
+                sent_count=models.F('sent_count') + sent,
+                error_count=models.F('error_count') + failed,
+            )
+            return False
+        self.checkpoint_id = last_id
+        return True
+
+    def hold(self, owner, seconds):
+        """Keep the lease through a deliberate pause, such as a rate-limit retry countdown."""
+        CampaignChunk.objects.filter(pk=self.pk, lease_owner=owner).update(
+            lease_expires_at=timezone.now() + timedelta(seconds=seconds + settings.EMAIL_CHUNK_LEASE_SECONDS)
+        )
+
+    def finish(self, owner):
+        CampaignChunk.objects.filter(pk=self.pk, lease_owner=owner).update(
+            status='done',
+            lease_owner='',
+            lease_expires_at=None,
+            finished_at=timezone.now(),
+        )
+
+
+class CampaignLink(models.Model):
+    """
+    An outbound link of a campaign. Tracked URLs in sent mail carry only
+    this row's id, and the click endpoint redirects to ``url``.
+    """
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='links')
+    url = models.URLField(max_length=2048)
+    position = models.PositiveIntegerField(default=0, help_text="Order of first appearance in the campaign content.")
+    clicks = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['campaign', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'url'], name='unique_campaign_link'),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id} - {self.url}"
+
+    @classmethod
+    def register(cls, campaign, urls):
+        """Ensure a row exists for each URL; return ``{url: link_id}``."""
+        positions = {}
+        for url in urls:
+            positions.setdefault(url, len(positions))
+        if not positions:
+            return {}
+        cls.objects.bulk_create(
+            [cls(campaign=campaign, url=url, position=position) for url, position in positions.items()],
+            ignore_conflicts=True
+        )
+        return dict(cls.objects.filter(campaign=campaign, url__in=positions).values_list('url', 'id'))
+
+    @classmethod
+    def add_clicks(cls, clicks):
+        """Add ``{(campaign_id, url): clicks}``; URLs clicked through the legacy endpoint get a row too."""
+        keys = sorted((key for key, count in clicks.items() if count), key=str)
+        if not keys:
+            return
+        cls.objects.bulk_create([cls(campaign_id=campaign_id, url=url) for campaign_id, url in keys], ignore_conflicts=True)
+        for campaign_id, url in keys:
+            cls.objects.filter(campaign_id=campaign_id, url=url).update(
+                clicks=models.F('clicks') + clicks[(campaign_id, url)]
+            )
+
+
+class CampaignHourlyStats(models.Model):
+    """
+    Event counts per campaign, hour and event type, kept up to date as
+    tracking events are flushed and batches are sent, so reports read a
+    handful of rows instead of counting ``CampaignAnalytics``.
+    """
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='hourly_stats')
+    hour = models.DateTimeField()
+    event_type = models.CharField(max_length=20)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['campaign', 'hour']
+        verbose_name_plural = "Campaign hourly stats"
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'hour', 'event_type'], name='unique_campaign_hour_event'),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id} {self.hour:%Y-%m-%d %H:00} {self.event_type}: {self.count}"
+
+    @staticmethod
+    def truncate(moment):
+        return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def add(cls, counts):
+        """Add ``{(campaign_id, hour, event_type): count}`` to the rollup."""
+        keys = sorted((key for key, count in counts.items() if count), key=str)
+        if not keys:
+            return
+        cls.objects.bulk_create(
+            [cls(campaign_id=campaign_id, hour=hour, event_type=event_type) for campaign_id, hour, event_type in keys],
+            ignore_conflicts=True
+        )
+        for key in keys:
+            campaign_id, hour, event_type = key
+            cls.objects.filter(campaign_id=campaign_id, hour=hour, event_type=event_type).update(
+                count=models.F('count') + counts[key]
+            )
+
+    @classmethod
+    def record(cls, campaign_id, event_type, count, moment=None):
+        cls.add({(campaign_id, cls.truncate(moment or timezone.now()), event_type): count})
+
+    @classmethod
+    def record_events(cls, events):
+        """Fold a batch of ``CampaignAnalytics`` rows into the rollup and the link click counts."""
+        counts = Counter(
+            (str(event.campaign_id), cls.truncate(event.event_time), event.event_type) for event in events
+        )
+        clicks = Counter(
+            (str(event.campaign_id), event.clicked_url)
+            for event in events if event.event_type == 'clicked' and event.clicked_url
+        )
+        cls.add(counts)
+        CampaignLink.add_clicks(clicks)
+
+    @classmethod
+    def summary(cls, campaign, days=7):
+        """
+        Totals per event type and a per-day timeline of the last ``days``
+        days, from one query over the campaign's rows.
+        """
+        today = timezone.localdate()
+        first_day = today - timedelta(days=days - 1)
+        timeline = {first_day + timedelta(days=offset): Counter() for offset in range(days)}
+        totals = Counter()
+        for hour, event_type, count in cls.objects.filter(campaign=campaign).values_list('hour', 'event_type', 'count'):
+            totals[event_type] += count
+            day = timezone.localtime(hour).date()
+            if day in timeline:
+                timeline[day][event_type] += count
+        event_types = [value for value, _ in CampaignAnalytics._meta.get_field('event_type').choices]
+        return {
+            'totals': totals,
+            'timeline': [
+                {'date': day, **{event_type: counts[event_type] for event_type in event_types}}
+                for day, counts in timeline.items()
+            ],
+        }
+
+    @classmethod
+    def rebuild(cls, campaign):
+        """
+        Recompute a campaign's rollup, link clicks and engagement counters
+        from ``CampaignAnalytics`` and the delivery ledger. Events still
+        waiting in the tracking buffer are added by the next flush as usual.
+        """
+        counts = Counter()
+        events = campaign.analytics.order_by().annotate(hour=TruncHour('event_time', tzinfo=dt_timezone.utc))
+        for hour, event_type, total in events.values_list('hour', 'event_type').annotate(total=models.Count('id')):
+            counts[(str(campaign.pk), hour, event_type)] += total
+        sent = campaign.recipients.filter(state=CampaignRecipient.SENT, sent_at__isnull=False).order_by().annotate(
+            hour=TruncHour('sent_at', tzinfo=dt_timezone.utc)
+        )
+        for hour, total in sent.values_list('hour').annotate(total=models.Count('id')):
+            counts[(str(campaign.pk), hour, 'sent')] += total
+        clicks = Counter(dict(
+            ((str(campaign.pk), url), total) for url, total in campaign.analytics.filter(
+                event_type='clicked', clicked_url__isnull=False
+            ).order_by().values_list('clicked_url').annotate(total=models.Count('id'))
+        ))
+
+        totals = Counter()
+        for (_, _, event_type), count in counts.items():
+            totals[event_type] += count
+
+        with transaction.atomic():
+            cls.objects.filter(campaign=campaign).delete()
+            campaign.links.update(clicks=0)
+            cls.add(counts)
+            CampaignLink.add_clicks(clicks)
+            Campaign.objects.filter(pk=campaign.pk).update(**{
+                field: totals[event_type] for event_type, field in ENGAGEMENT_COUNTERS.items()
+            })
+
+
+class CampaignUniqueSketch(models.Model):
+    """
+    HyperLogLog of the subscribers who opened or clicked a campaign, merged
+    at each tracking event flush. ``estimate`` is refreshed with the
+    registers, so unique counts are a plain read however many events the
+    campaign has.
+    """
+    TRACKED_EVENTS = ('opened', 'clicked')
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='unique_sketches')
+    event_type = models.CharField(max_length=20)
+    registers = models.BinaryField(default=b'')
+    estimate = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'event_type'], name='unique_campaign_sketch'),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id} unique {self.event_type}: ~{self.estimate}"
+
+    @classmethod
+    def add(cls, subscribers):
+        """Add ``{(campaign_id, event_type): subscriber_ids}`` to the sketches."""
+        keys = sorted((key for key, ids in subscribers.items() if ids), key=str)
+        if not keys:
+            return
+        cls.objects.bulk_create(
+            [cls(campaign_id=campaign_id, event_type=event_type) for campaign_id, event_type in keys],
+            ignore_conflicts=True
+        )
+        sketches = cls.objects.select_for_update().filter(
+            campaign_id__in={campaign_id for campaign_id, _ in keys},
+            event_type__in={event_type for _, event_type in keys}
+        ).order_by('pk')
+
+        changed = []
+        for sketch in sketches:
+            ids = subscribers.get((str(sketch.campaign_id), sketch.event_type))
+            if not ids:
+                continue
+            hll = HyperLogLog(bytes(sketch.registers))
+            if hll.update(ids):
+                sketch.registers = bytes(hll.registers)
+                sketch.estimate = hll.count()
+                sketch.updated_at = timezone.now()
+                changed.append(sketch)
+        cls.objects.bulk_update(changed, ['registers', 'estimate', 'updated_at'])
+
+    @classmethod
+    def record_events(cls, events):
+        subscribers = {}
+        for event in events:
+            if event.event_type in cls.TRACKED_EVENTS:
+                subscribers.setdefault((str(event.campaign_id), event.event_type), []).append(event.subscriber_id)
+        cls.add(subscribers)
+
+    @classmethod
+    def estimates(cls, campaign):
+        """``{event_type: approximate unique subscribers}`` from one query."""
+        counts = dict.fromkeys(cls.TRACKED_EVENTS, 0)
+        counts.update(cls.objects.filter(campaign=campaign).values_list('event_type', 'estimate'))
+        return counts
+
+    @classmethod
+    def rebuild(cls, campaign):
+        """Rebuild the sketches from ``CampaignAnalytics``; returns the exact unique counts."""
+        exact = {}
+        with transaction.atomic():
+            cls.objects.filter(campaign=campaign).delete()
+            for event_type in cls.TRACKED_EVENTS:
+                hll = HyperLogLog()
+                subscriber_ids = campaign.analytics.filter(event_type=event_type).order_by().values_list(
+                    'subscriber_id', flat=True
+                ).distinct()
+                exact[event_type] = 0
+                for subscriber_id in subscriber_ids.iterator(chunk_size=10000):
+                    hll.add(subscriber_id)
+                    exact[event_type] += 1
+                if exact[event_type]:
+                    cls.objects.create(
+                        campaign=campaign,
+                        event_type=event_type,
+                        registers=bytes(hll.registers),
+                        estimate=hll.count()
+                    )
+        return exact
+
+
 class CampaignAnalytics(models.Model):
     campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='analytics')
     subscriber = models.ForeignKey(Subscriber, on_delete=models.CASCADE)
@@ -430,10 +1196,10 @@ class CampaignAnalytics(models.Model):
         ('bounced', 'Bounced'),
         ('unsubscribed', 'Unsubscribed')
     ])
-    event_time = models.DateTimeField(auto_now_add=True)
+    event_time = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(null=True, blank=True)
-    clicked_url = models.URLField(null=True, blank=True)
+    clicked_url = models.URLField(max_length=2048, null=True, blank=True)
 
     class Meta:
         verbose_name_plural = "Campaign Analytics"
@@ -0,0 +1,71 @@
+import json
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ('sent', 'failed')
+
+# Campaign counters published under another key than the field name.
+_TOTAL_KEYS = {
+    'sent_count': 'sent_total',
+    'error_count': 'failed_total',
+}
+
+
+def progress_channel(campaign_id):
+    return f"campaign-progress:{campaign_id}"
+
+
+def streaming_enabled():
+    """Progress is pushed through Redis pub/sub when the Celery broker is Redis."""
+    return (
+        settings.CELERY_BROKER_URL.startswith(('redis://', 'rediss://'))
+        and not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False)
+    )
+
+
+_client = None
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    return _client
+
+
+def publish_progress(campaign_id, **delta):
+    """
+    Push a progress update to the campaign's SSE subscribers. Every value
+    is absolute (``status``, ``sent_total``, ``open_count``...), never an
+    increment, so an update that is also in a stream's snapshot is not
+    counted twice. Never raises: progress is best effort.
+    """
+    if not streaming_enabled():
+        return
+    try:
+        _get_client().publish(progress_channel(campaign_id), json.dumps(delta))
+    except Exception as e:
+        logger.warning(f"Could not publish progress for campaign {campaign_id}: {str(e)}")
+
+
+def publish_totals(campaign_id, fields, **data):
+    """
+    Publish the committed values of the campaign's counter ``fields``, with
+    ``data``. Call it once the counters' update has committed.
+    """
+    if not streaming_enabled():
+        return
+    from .models import Campaign
+
+    try:
+        totals = Campaign.objects.filter(pk=campaign_id).values(*fields).first()
+    except Exception as e:
+        logger.warning(f"Could not read progress for campaign {campaign_id}: {str(e)}")
+        return
+    if totals is not None:
+        publish_progress(campaign_id, **{_TOTAL_KEYS.get(field, field): value for field, value in totals.items()}, **data)
@@ -0,0 +1,147 @@
+import logging
+import uuid
+
+from django.template.loader import render_to_string
+from django.utils.html import conditional_escape, strip_tags
+
+from utils.quill import quill_html
+from .links import LinkRewriter, get_open_url_affixes
+
+logger = logging.getLogger(__name__)
+
+EMAIL_TEMPLATE_NAME = 'campaigns/email_template.html'
+
+# Subscriber attributes the email template may reference per recipient.
+SUBSCRIBER_SLOT_FIELDS = ('id', 'email', 'first_name', 'last_name')
+
+
+class _Slot:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"<Slot {self.name}>"
+
+
+class _SlotSubscriber:
+    """Stand-in subscriber whose attributes render as slot markers."""
+
+    def __init__(self, markers):
+        for field in SUBSCRIBER_SLOT_FIELDS:
+            setattr(self, field, markers[field])
+
+
+class CampaignRenderer:
+    """
+    Render a campaign's email body once and fill per-recipient slots by
+    string concatenation.
+
+    Links in the campaign content are rewritten to tracked URLs first (see
+    ``LinkRewriter``), with the subscriber id left as a slot, as it is in the
+    open-tracking pixel URL. The template
+    is rendered with unique marker strings in place of the subscriber
+    fields and the unsubscribe URL. The output (and its
+    ``strip_tags`` text version) is then split on those markers, so every
+    recipient only costs a join. Markers are plain alphanumerics, so Django's
+    autoescaping leaves them intact; the real values are escaped the same way
+    when the slots are filled.
+
+    ``verify()`` compares the skeleton output with a full Django render for a
+    given recipient. If they ever differ (e.g. the template applies a filter
+    to a subscriber field) the renderer disables itself and ``render()``
+    falls back to ``render_to_string`` for every message.
+    """
+
+    def __init__(self, campaign):
+        self.campaign = campaign
+        self.content_html = quill_html(campaign.content)
+        self.links = LinkRewriter(campaign, self.content_html)
+        self._open_prefix, self._open_suffix = get_open_url_affixes(campaign.id)
+        self.enabled = True
+        self.verified = False
+
+        token = uuid.uuid4().hex
+        self._markers = {field: f"SLOT{token}{field.upper()}X" for field in SUBSCRIBER_SLOT_FIELDS}
+        self._markers['unsubscribe_url'] = f"SLOT{token}UNSUBSCRIBEX"
+        self._slot_by_marker = {marker: name for name, marker in self._markers.items()}
+
+        html = render_to_string(EMAIL_TEMPLATE_NAME, self._base_context(
+            subscriber=_SlotSubscriber(self._markers),
+            unsubscribe_url=self._markers['unsubscribe_url'],
+        ))
+        self.html_parts = self._split(html)
+        self.text_parts = self._split(strip_tags(html))
+
+    def _base_context(self, subscriber, unsubscribe_url):
+        return {
+            'campaign': self.campaign,
+            'campaign_content_html': self.links.render(subscriber.id),
+            'tracking_pixel_url': f"{self._open_prefix}{subscriber.id}{self._open_suffix}",
+            'subscriber': subscriber,
+            'unsubscribe_url': unsubscribe_url,
+            'is_test': False,
+        }
+
+    def _split(self, rendered):
+        """Split rendered output into literal strings and slot names."""
+        parts = [rendered]
+        for marker, name in self._slot_by_marker.items():
+            split_parts = []
+            for part in parts:
+                if not isinstance(part, str) or marker not in part:
+                    split_parts.append(part)
+                    continue
+                pieces = part.split(marker)
+                for index, piece in enumerate(pieces):
+                    if index:
+                        split_parts.append(_Slot(name))
+                    split_parts.append(piece)
+            parts = split_parts
+        return parts
+
+    def _slot_values(self, subscriber, unsubscribe_url):
+        values = {
+            field: str(conditional_escape(getattr(subscriber, field)))
+            for field in SUBSCRIBER_SLOT_FIELDS
+        }
+        values['unsubscribe_url'] = str(conditional_escape(unsubscribe_url))
+        return values
+
+    @staticmethod
+    def _join(parts, values):
+        return ''.join(values[part.name] if isinstance(part, _Slot) else part for part in parts)
+
+    def render_full(self, subscriber, unsubscribe_url):
+        """Render through the Django template engine (the reference output)."""
+        html = render_to_string(EMAIL_TEMPLATE_NAME, self._base_context(subscriber, unsubscribe_url))
+        return html, strip_tags(html)
+
+    def render(self, subscriber, unsubscribe_url):
+        """Return ``(html, text)`` for one recipient."""
+        if not self.enabled:
+            return self.render_full(subscriber, unsubscribe_url)
+        if not self.verified:
+            self.verify(subscriber, unsubscribe_url)
+            if not self.enabled:
+                return self.render_full(subscriber, unsubscribe_url)
+
+        values = self._slot_values(subscriber, unsubscribe_url)
+        return self._join(self.html_parts, values), self._join(self.text_parts, values)
+
+    def verify(self, subscriber, unsubscribe_url):
+        """Check the skeleton output matches a full render byte for byte."""
+        values = self._slot_values(subscriber, unsubscribe_url)
+        skeleton = (self._join(self.html_parts, values), self._join(self.text_parts, values))
+        full = self.render_full(subscriber, unsubscribe_url)
+
+        self.verified = True
+        if skeleton != full:
+            self.enabled = False
+            logger.warning(
+                f"Render skeleton mismatch for campaign {self.campaign.id}; "
+                f"falling back to full template rendering"
+            )
+            return False
+        return True
@@ -0,0 +1,176 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from .throttle import get_account_key
+
+logger = logging.getLogger(__name__)
+
+# ``connection_kwargs`` go to ``get_connection`` (empty for the settings
+# based default); ``limits`` are the provider's EMAIL_RATE_LIMITS entry.
+Provider = namedtuple('Provider', ['key', 'name', 'weight', 'connection_kwargs', 'from_email', 'limits'])
+
+
+class ProvidersUnavailable(Exception):
+    """Every SMTP provider is failing or out of quota for at least ``wait`` seconds."""
+
+    def __init__(self, wait):
+        self.wait = wait
+        super().__init__(f"No SMTP provider available for {wait:.0f}s")
+
+
+class _Health:
+    def __init__(self):
+        self.latency = 0.0       # EWMA of seconds per message
+        self.failures = 0        # consecutive failed submissions
+        self.open_until = 0.0    # circuit breaker
+        self.saturated_until = 0.0  # rate limit exhausted
+
+    def blocked_until(self):
+        return max(self.open_until, self.saturated_until)
+
+
+def _load_providers():
+    from core.models import SMTPSetting
+
+    default_limits = settings.EMAIL_RATE_LIMITS['default']
+    providers = []
+    for smtp in SMTPSetting.objects.filter(is_active=True, weight__gt=0):
+        providers.append(Provider(
+            key=f"smtp:{smtp.pk}",
+            name=smtp.name,
+            weight=smtp.weight,
+            connection_kwargs={
+                'host': smtp.email_host,
+                'port': smtp.email_port,
+                'username': smtp.email_host_user or '',
+                'password': smtp.email_host_password or '',
+                'use_tls': smtp.email_use_tls,
+            },
+            from_email=smtp.default_from_email,
+            limits={
+                'per_second': default_limits.get('per_second', 0) if smtp.rate_per_second is None else smtp.rate_per_second,
+                'per_day': default_limits.get('per_day', 0) if smtp.rate_per_day is None else smtp.rate_per_day,
+            },
+        ))
+
+    if not providers:
+        # No providers configured: send through the EMAIL_* settings as before.
+        providers.append(Provider(
+            key=get_account_key(),
+            name='default',
+            weight=1,
+            connection_kwargs={},
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            limits=None,
+        ))
+    return providers
+
+
+class ProviderRouter:
+    """
+    Spread recipients across the active SMTP providers in proportion to
+    their weights, steering away from providers that are failing or slow.
+
+    Assignment is smooth weighted round robin, so even small batches follow
+    the weights. A provider's weight is scaled down once its per-message
+    latency goes over ``EMAIL_PROVIDER_SLOW_SECONDS``; after
+    ``EMAIL_PROVIDER_FAILURE_THRESHOLD`` failed submissions in a row its
+    circuit opens and it gets no traffic for ``EMAIL_PROVIDER_COOLDOWN``
+    seconds, after which a single failure opens it again. A provider whose
+    rate limit is exhausted is skipped until its quota refills.
+
+    Health is tracked per worker process; the provider list is reloaded
+    every ``EMAIL_PROVIDER_REFRESH`` seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers = []
+        self._loaded_at = None
+        self._health = {}
+        self._current = {}
+
+    def providers(self):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at > settings.EMAIL_PROVIDER_REFRESH:
+            providers = _load_providers()
+            with self._lock:
+                self._providers = providers
+                self._loaded_at = now
+        return self._providers
+
+    def _get_health(self, provider):
+        return self._health.setdefault(provider.key, _Health())
+
+    def _effective_weight(self, provider):
+        slowness = self._get_health(provider).latency / settings.EMAIL_PROVIDER_SLOW_SECONDS
+        return provider.weight / max(1.0, slowness)
+
+    def split(self, items, exclude=()):
+        """
+        Assign ``items`` to providers. Returns ``[(provider, items), ...]``.
+        Raises ``ProvidersUnavailable`` if no provider can take traffic.
+        """
+        providers = self.providers()
+        now = time.monotonic()
+        with self._lock:
+            available = [
+                provider for provider in providers
+                if provider.key not in exclude and self._get_health(provider).blocked_until() <= now
+            ]
+            if not available:
+                blocked = [self._get_health(provider).blocked_until() - now for provider in providers]
+                raise ProvidersUnavailable(max(1.0, min(blocked) if blocked else 1.0))
+
+            weights = {provider.key: self._effective_weight(provider) for provider in available}
+            total = sum(weights.values())
+            groups = {provider.key: [] for provider in available}
+            for item in items:
+                for key, weight in weights.items():
+                    self._current[key] = self._current.get(key, 0.0) + weight
+                chosen = max(weights, key=lambda key: self._current[key])
+                self._current[chosen] -= total
+                groups[chosen].append(item)
+
+        return [(provider, groups[provider.key]) for provider in available if groups[provider.key]]
+
+    def report(self, provider, results, elapsed):
+        """Update a provider's health from the ``DeliveryResult``s of one submission."""
+        attempted = [result for result in results if result is not None]
+        with self._lock:
+            health = self._get_health(provider)
+            if any(result.delivered or result.smtp_code or result.permanent for result in attempted):
+                # The server answered, so the provider is up even if it rejected some recipients.
+                health.failures = 0
+                health.open_until = 0.0
+                per_message = elapsed / len(attempted)
+                health.latency = per_message if not health.latency else 0.8 * health.latency + 0.2 * per_message
+                return
+
+            health.failures += 1
+            if health.failures >= settings.EMAIL_PROVIDER_FAILURE_THRESHOLD:
+                health.open_until = time.monotonic() + settings.EMAIL_PROVIDER_COOLDOWN
+                logger.error(
+                    f"SMTP provider {provider.name} failed {health.failures} times in a row; "
+                    f"pausing it for {settings.EMAIL_PROVIDER_COOLDOWN}s"
+                )
+
+    def saturate(self, provider, wait):
+        """Skip a provider until its rate limit allows sending again."""
+        with self._lock:
+            self._get_health(provider).saturated_until = time.monotonic() + wait
+        logger.info(f"SMTP provider {provider.name} is out of quota for {wait:.0f}s")
+
+
+_router = None
+
+
+def get_router():
+    global _router
+    if _router is None:
+        _router = ProviderRouter()
+    return _router
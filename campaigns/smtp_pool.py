@@ -0,0 +1,217 @@
+import atexit
+import logging
+import os
+import smtplib
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class _MessageCursor:
+    """
+    Iterable handed to ``send_messages`` that remembers which message was
+    in flight, so a dropped session can be resumed without resending the
+    messages the server already accepted.
+    """
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.position = 0
+
+    def __bool__(self):
+        return bool(self.messages)
+
+    def __iter__(self):
+        for self.position, message in enumerate(self.messages):
+            yield message
+
+
+# ``permanent`` marks failures that must not be retried (5xx replies,
+# addresses the backend refuses to format).
+DeliveryResult = namedtuple('DeliveryResult', ['delivered', 'smtp_code', 'permanent'])
+
+
+class SMTPConnectionPool:
+    """
+    Per-process pool of open, authenticated email backend connections.
+
+    Connections are keyed by their backend settings and reused across
+    batches and campaigns, so the TLS handshake and AUTH are paid once per
+    session instead of once per batch. Sessions that sat idle longer than
+    ``EMAIL_POOL_HEALTHCHECK_AFTER`` seconds are checked with NOOP before
+    reuse, and a session the server dropped mid-batch is reopened and the
+    batch resumed from the message that was in flight.
+    """
+
+    MAX_RECONNECTS = 2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._pid = os.getpid()
+
+    def _key(self, kwargs):
+        return (
+            settings.EMAIL_BACKEND,
+            settings.EMAIL_HOST,
+            settings.EMAIL_PORT,
+            settings.EMAIL_HOST_USER,
+        ) + tuple(sorted(kwargs.items()))
+
+    def _reset_after_fork(self):
+        # Sockets inherited from the parent process belong to the parent.
+        if self._pid != os.getpid():
+            self._idle = {}
+            self._pid = os.getpid()
+
+    @staticmethod
+    def is_alive(backend):
+        smtp = getattr(backend, 'connection', None)
+        if smtp is None:
+            # Non-SMTP backends (console, locmem) have no session to check.
+            return not hasattr(backend, 'connection')
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _close(backend):
+        try:
+            backend.close()
+        except Exception:
+            pass
+
+    def acquire(self, **kwargs):
+        key = self._key(kwargs)
+        with self._lock:
+            self._reset_after_fork()
+            idle = self._idle.get(key, [])
+            entry = idle.pop() if idle else None
+
+        if entry:
+            backend, last_used = entry
+            if time.monotonic() - last_used < settings.EMAIL_POOL_HEALTHCHECK_AFTER or self.is_alive(backend):
+                return backend
+            logger.info("Discarding stale SMTP session from pool")
+            self._close(backend)
+
+        backend = get_connection(fail_silently=False, **kwargs)
+        backend.open()
+        backend._pool_key = key
+        return backend
+
+    def release(self, backend):
+        if getattr(backend, 'connection', False) is None:
+            # Closed SMTP backend; nothing worth keeping.
+            return
+        with self._lock:
+            self._reset_after_fork()
+            idle = self._idle.setdefault(backend._pool_key, [])
+            if len(idle) < settings.EMAIL_POOL_MAX_IDLE:
+                idle.append((backend, time.monotonic()))
+                return
+        self._close(backend)
+
+    def discard(self, backend):
+        self._close(backend)
+
+    @contextmanager
+    def connection(self, **kwargs):
+        backend = self.acquire(**kwargs)
+        try:
+            yield backend
+        except Exception:
+            self.discard(backend)
+            raise
+        else:
+            self.release(backend)
+
+    @staticmethod
+    def _failure(code):
+        return DeliveryResult(False, code, bool(code and code >= 500))
+
+    def deliver(self, messages, **kwargs):
+        """
+        Submit a batch over one pooled session and return a
+        ``DeliveryResult`` per message.
+
+        The batch goes to the backend as a single ``send_messages`` call.
+        If the server rejects a message, the messages before it are marked
+        delivered, the rejected one gets the SMTP reply code, and the rest
+        of the batch is submitted again on the same session. If the session
+        drops, the messages the server accepted are recorded as delivered
+        and the pool reconnects and resumes from the message that was in
+        flight. After ``MAX_RECONNECTS`` reconnects, or when reconnecting
+        fails, it stops, and messages that were never attempted are left
+        as ``None``.
+        """
+        results = [None] * len(messages)
+        start = 0
+        reconnects = 0
+
+        with self.connection(**kwargs) as backend:
+            while start < len(messages):
+                cursor = _MessageCursor(messages[start:])
+                try:
+                    backend.send_messages(cursor)
+                except smtplib.SMTPServerDisconnected:
+                    failed_at = start + cursor.position
+                    # Record what the server accepted before touching the
+                    # session, so a failed reconnect cannot cause a resend.
+                    for index in range(start, failed_at):
+                        results[index] = DeliveryResult(True, 250, False)
+                    start = failed_at
+                    self._close(backend)
+                    if reconnects >= self.MAX_RECONNECTS:
+                        logger.error(f"SMTP session lost; leaving {len(messages) - start} messages unsent")
+                        break
+                    reconnects += 1
+                    logger.warning(f"SMTP session dropped after {failed_at} messages; reconnecting")
+                    try:
+                        backend.open()
+                    except (smtplib.SMTPException, OSError) as e:
+                        logger.error(f"SMTP reconnect failed: {str(e)}; leaving {len(messages) - start} messages unsent")
+                        break
+                    # Retry the in-flight message on the new session.
+                    continue
+                except smtplib.SMTPRecipientsRefused as e:
+                    code = next(iter(e.recipients.values()), (None, None))[0]
+                    failed_at, result = start + cursor.position, self._failure(code)
+                except smtplib.SMTPResponseException as e:
+                    failed_at, result = start + cursor.position, self._failure(e.smtp_code)
+                except ValueError as e:
+                    logger.error(f"Undeliverable address: {str(e)}")
+                    failed_at, result = start + cursor.position, DeliveryResult(False, None, True)
+                except smtplib.SMTPException as e:
+                    logger.error(f"SMTP error without a reply code: {str(e)}")
+                    failed_at, result = start + cursor.position, DeliveryResult(False, None, False)
+                else:
+                    failed_at, result = len(messages), None
+
+                for index in range(start, failed_at):
+                    results[index] = DeliveryResult(True, 250, False)
+                if result is None:
+                    start = failed_at
+                else:
+                    results[failed_at] = result
+                    start = failed_at + 1
+
+        return results
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for entries in idle.values():
+            for backend, _ in entries:
+                self._close(backend)
+
+
+pool = SMTPConnectionPool()
+atexit.register(pool.close_all)
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+from django.urls import Resolver404, resolve
+
+from .progress import FINAL_STATUSES, progress_channel, streaming_enabled
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS = 15
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n".encode('utf-8')
+
+
+@sync_to_async
+def _load_snapshot(headers, campaign_id):
+    """The campaign's progress data if the session user owns it, else ``None``."""
+    from .models import Campaign
+
+    close_old_connections()
+    try:
+        request = HttpRequest()
+        request.COOKIES = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        user = get_user(request)
+        if not user.is_authenticated:
+            return None
+        campaign = Campaign.objects.filter(pk=campaign_id, owner=user).first()
+        return campaign.get_progress_data() if campaign else None
+    finally:
+        close_old_connections()
+
+
+class CampaignProgressStream:
+    """
+    ASGI wrapper that serves the ``campaign_events`` URL as a Server-Sent
+    Events stream and passes every other request to Django.
+
+    The stream opens with a ``snapshot`` event holding the campaign's
+    progress data, then forwards the ``progress`` updates the sending tasks
+    publish on the campaign's Redis channel, until the campaign is sent or
+    failed or the client goes away. Without a Redis broker it answers 204,
+    which tells ``EventSource`` not to reconnect; the pages then poll.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'].endswith('/events/'):
+            try:
+                match = resolve(scope['path'])
+            except Resolver404:
+                match = None
+            if match and match.url_name == 'campaign_events' and match.namespace == 'campaign':
+                return await self.stream(scope, receive, send, match.kwargs['pk'])
+        return await self.application(scope, receive, send)
+
+    async def respond(self, send, status):
+        await send({'type': 'http.response.start', 'status': status, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def stream(self, scope, receive, send, campaign_id):
+        if not streaming_enabled():
+            return await self.respond(send, 204)
+
+        import redis.asyncio as redis
+
+        client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+        pubsub = client.pubsub()
+        started = False
+        try:
+            # Subscribe before reading the snapshot so no update falls in between.
+            # Updates carry totals, so one already in the snapshot is harmless.
+            await pubsub.subscribe(progress_channel(campaign_id))
+            snapshot = await _load_snapshot(dict(scope['headers']), campaign_id)
+            if snapshot is None:
+                return await self.respond(send, 404)
+
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            started = True
+            await send({'type': 'http.response.body', 'body': _event('snapshot', snapshot), 'more_body': True})
+
+            disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+            try:
+                status = snapshot.get('status')
+                while status not in FINAL_STATUSES and not disconnected.done():
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=KEEPALIVE_SECONDS)
+                    if message is None:
+                        body = b': keepalive\n\n'
+                    else:
+                        delta = json.loads(message['data'])
+                        status = delta.get('status', status)
+                        body = _event('progress', delta)
+                    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            finally:
+                disconnected.cancel()
+            await send({'type': 'http.response.body', 'body': b''})
+
+        except (redis.RedisError, OSError) as e:
+            logger.warning(f"Progress stream for campaign {campaign_id} unavailable: {str(e)}")
+            if started:
+                await send({'type': 'http.response.body', 'body': b''})
+            else:
+                # Let the page fall back to polling.
+                await self.respond(send, 204)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
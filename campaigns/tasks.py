@@ -1,67 +1,234 @@
-from celery import shared_task
+from datetime import timedelta
+
+from celery import shared_task, chord
+from celery.exceptions import Retry
 from celery.utils.log import get_task_logger
 from django.core.mail import get_connection
-from .models import Campaign
-from subscribers.models import Subscriber
+from .models import Campaign, CampaignChunk, CampaignRecipient
+from .throttle import RateLimitExceeded
+from .routing import ProvidersUnavailable
+from .progress import publish_progress, publish_totals
 from django.utils import timezone
 logger = get_task_logger(__name__)
-from django.db import transaction
+from django.db.models import F, Sum
 from django.conf import settings
 
 
 @shared_task(bind=True, acks_late=True)
-def send_bulk_emails(self, campaign_id, subscriber_ids):
-    from django.db import connection
-
+def send_bulk_emails(self, campaign_id, snapshot_id):
+    """
+    Coordinator: split the audience into keyset chunks of the list membership
+    table (up to ``snapshot_id``) and fan them out as a chord so every worker
+    process can take a share of the campaign. Each chunk is a
+    ``CampaignChunk`` row holding its checkpoint, so only the chunk id
+    travels through the broker. The chord callback marks the campaign as
+    sent once all chunks are done.
+    """
     try:
-        connection.close()
-
         campaign = Campaign.objects.get(id=campaign_id)
+        chunks, created = CampaignChunk.plan(campaign, snapshot_id, settings.EMAIL_CHUNK_SIZE)
+
         campaign.task_id = self.request.id
         campaign.status = 'sending'
-        campaign.save()
+        update_fields = ['task_id', 'status', 'updated_at']
+        if created:
+            # A redelivered coordinator keeps the counts of the chunks already sent.
+            campaign.sent_count = 0
+            campaign.error_count = 0
+            campaign.recipient_total = campaign.count_snapshot_recipients(snapshot_id)
+            update_fields += ['sent_count', 'error_count', 'recipient_total']
+        campaign.save(update_fields=update_fields)
+        publish_progress(campaign_id, status='sending', recipient_total=campaign.recipient_total)
 
-        logger.info(f"[{campaign_id}] Start sending emails")
+        pending = [chunk.id for chunk in chunks if chunk.status not in ('done', 'failed')]
+        logger.info(f"[{campaign_id}] Dispatching {len(pending)} of {len(chunks)} chunks up to membership {snapshot_id}")
+
+        callback = finalize_campaign_send.si(campaign_id).on_error(mark_campaign_failed.s(campaign_id))
+        if pending:
+            chord([send_campaign_chunk.s(chunk_id) for chunk_id in pending])(callback)
+        else:
+            callback.delay()
+
+        return {'chunks': len(chunks), 'snapshot_id': snapshot_id}
+
+    except Exception as e:
+        logger.critical(f"[{campaign_id}] Failed to dispatch: {str(e)}", exc_info=True)
+        if 'campaign' in locals():
+            campaign.status = 'failed'
+            campaign.save(update_fields=['status'])
+        raise self.retry(exc=e, countdown=60)
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def send_campaign_chunk(self, chunk_id):
+    """
+    Send one chunk of a campaign, resuming from its last checkpoint.
+
+    The chunk is claimed with a lease that is renewed before every batch is
+    sent and again with the checkpoint after it. Each batch's outcomes are
+    committed to the delivery ledger as soon as SMTP returns, outside any
+    transaction that could roll them back. A retry, a redelivery after a
+    worker crash, or a worker taking over an expired lease therefore starts
+    after the last checkpoint, and recipients the ledger already shows as
+    sent are skipped.
+    The lease owner is the task id, so a redelivered or retried task
+    reclaims its own chunk at once.
+    """
+    from django.db import connection
+
+    owner = self.request.id
+    try:
+        connection.close()
 
-        batch_size = settings.EMAIL_BATCH_SIZE
-        sent_count = 0
-        error_count = 0
+        chunk = CampaignChunk.claim(chunk_id, owner)
+        if chunk is None:
+            chunk = CampaignChunk.objects.get(pk=chunk_id)
+            if chunk.status in ('done', 'failed'):
+                return {'sent': chunk.sent_count, 'errors': chunk.error_count}
+            # Another worker holds a live lease; check back once it could have expired.
+            logger.info(f"[{chunk.campaign_id}] Chunk {chunk_id} is leased by {chunk.lease_owner}; waiting")
+            raise self.retry(countdown=settings.EMAIL_CHUNK_LEASE_SECONDS, max_retries=None)
 
-        for i in range(0, len(subscriber_ids), batch_size):
-            batch_ids = subscriber_ids[i:i + batch_size]
-            logger.info(f"[{campaign_id}] Processing batch {i//batch_size + 1} with {len(batch_ids)} IDs")
+        campaign = chunk.campaign
+        campaign_id = campaign.id
+        if chunk.checkpoint_id > chunk.after_id:
+            logger.info(f"[{campaign_id}] Resuming chunk {chunk_id} after membership {chunk.checkpoint_id}")
+
+        batches = campaign.iter_recipient_batches(chunk.snapshot_id, after_id=chunk.checkpoint_id, upto_id=chunk.upto_id)
+        for batch_number, (last_id, subscribers) in enumerate(batches, start=1):
+            logger.info(f"[{campaign_id}] Processing batch {batch_number} with {len(subscribers)} subscribers")
 
             try:
-                with transaction.atomic():
-                    campaign._process_batch(batch_ids)
-                    sent_count += len(batch_ids)
+                if not chunk.renew(owner):
+                    raise LeaseLost(chunk_id)
+                sent, failed = campaign._process_batch(subscribers)
+                if not chunk.checkpoint(owner, last_id, sent, failed):
+                    raise LeaseLost(chunk_id)
+                logger.debug(f"[{campaign_id}] Batch {batch_number} success")
+                publish_totals(campaign_id, ['sent_count', 'error_count'])
 
-                    campaign.sent_count = sent_count
-                    campaign.error_count = error_count
-                    campaign.save(update_fields=['sent_count', 'error_count'])
+            except LeaseLost:
+                logger.warning(f"[{campaign_id}] Lost the lease on chunk {chunk_id}; another worker took over")
+                return {'sent': 0, 'errors': 0}
 
-                    logger.debug(f"[{campaign_id}] Batch {i//batch_size + 1} success")
+            except (RateLimitExceeded, ProvidersUnavailable) as e:
+                # Quota exhausted or every provider down: pick the chunk up again after the last checkpoint.
+                logger.warning(f"[{campaign_id}] {str(e)}; rescheduling chunk from membership {chunk.checkpoint_id}")
+                chunk.hold(owner, e.wait)
+                raise self.retry(countdown=int(e.wait), max_retries=None)
 
             except Exception as e:
-                error_count += len(batch_ids)
-                logger.error(f"[{campaign_id}] Batch {i//batch_size + 1} failed: {str(e)}", exc_info=True)
+                logger.error(f"[{campaign_id}] Batch {batch_number} failed: {str(e)}", exc_info=True)
                 connection.close()
+                # Outcomes that reached the ledger are already counted; only
+                # recipients left without one become errors.
+                failed = CampaignRecipient.objects.filter(
+                    campaign_id=campaign_id, subscriber__in=subscribers, state=CampaignRecipient.QUEUED
+                ).count()
+                Campaign.objects.filter(id=campaign_id).update(error_count=F('error_count') + failed)
+                if not chunk.checkpoint(owner, last_id, 0, failed):
+                    return {'sent': 0, 'errors': 0}
+                publish_totals(campaign_id, ['sent_count', 'error_count'])
 
             self.update_state(
                 state='PROGRESS',
-                meta={'sent': sent_count, 'errors': error_count}
+                meta={'chunk': chunk_id, 'last_id': last_id}
             )
 
-        campaign.status = 'sent'
-        campaign.sent_at = timezone.now()
-        campaign.save()
+        chunk.finish(owner)
+        chunk.refresh_from_db(fields=['sent_count', 'error_count'])
+        logger.info(f"[{campaign_id}] Chunk {chunk_id} completed: {chunk.sent_count} sent, {chunk.error_count} errors")
+        return {'sent': chunk.sent_count, 'errors': chunk.error_count}
 
-        logger.info(f"[{campaign_id}] Email sending completed successfully")
-        return {'sent': sent_count, 'errors': error_count}
+    except Retry:
+        raise
 
     except Exception as e:
-        logger.critical(f"[{campaign_id}] Failed completely: {str(e)}", exc_info=True)
-        if 'campaign' in locals():
-            campaign.status = 'failed'
-            campaign.save(update_fields=['status'])
+        # The lease is kept: the retry carries the same task id and picks the
+        # chunk up again, or the reaper hands it on once the lease expires.
+        logger.critical(f"[chunk {chunk_id}] Chunk failed completely: {str(e)}", exc_info=True)
         raise self.retry(exc=e, countdown=60)
+
+
+class LeaseLost(Exception):
+    """The chunk's lease expired and was claimed by another worker."""
+
+
+@shared_task
+def finalize_campaign_send(campaign_id):
+    """Mark the campaign sent once every chunk is finished. Safe to run more than once."""
+    chunks = CampaignChunk.objects.filter(campaign_id=campaign_id)
+    if chunks.exclude(status__in=['done', 'failed']).exists():
+        logger.info(f"[{campaign_id}] Chunks still in progress; leaving the campaign to the chunk reaper")
+        return None
+
+    totals = chunks.aggregate(sent=Sum('sent_count'), errors=Sum('error_count'))
+    status = 'failed' if chunks.filter(status='failed').exists() else 'sent'
+    Campaign.objects.filter(id=campaign_id, status='sending').update(
+        status=status,
+        sent_at=timezone.now() if status == 'sent' else None,
+        updated_at=timezone.now()
+    )
+
+    logger.info(f"[{campaign_id}] Email sending completed: {totals['sent'] or 0} sent, {totals['errors'] or 0} errors")
+    # Totals, so streams that missed an update end up right.
+    publish_progress(campaign_id, status=status, sent_total=totals['sent'] or 0, failed_total=totals['errors'] or 0)
+    return {'sent': totals['sent'] or 0, 'errors': totals['errors'] or 0}
+
+
+@shared_task
+def mark_campaign_failed(request, exc, traceback, campaign_id):
+    logger.critical(f"[{campaign_id}] Sending failed in task {request.id}: {exc}")
+    if CampaignChunk.objects.filter(campaign_id=campaign_id, status__in=['pending', 'running']).exists():
+        # A chunk died with its worker; the reaper will hand it to another worker.
+        logger.warning(f"[{campaign_id}] Unfinished chunks remain; leaving them to the chunk reaper")
+        return
+    Campaign.objects.filter(id=campaign_id).update(status='failed')
+    publish_progress(campaign_id, status='failed')
+
+
+@shared_task
+def requeue_stalled_chunks():
+    """
+    Periodic: hand chunks whose worker died (lease expired without a
+    heartbeat) to another worker, and give up on chunks that keep dying.
+    A requeued chunk is reserved for one lease period so it is not sent out
+    again while its task waits in the queue.
+    """
+    now = timezone.now()
+    stalled = CampaignChunk.objects.filter(
+        status__in=['pending', 'running'],
+        lease_expires_at__lt=now,
+        campaign__status='sending',
+    )
+
+    requeued = 0
+    for chunk in stalled:
+        if chunk.attempts >= settings.EMAIL_CHUNK_MAX_ATTEMPTS:
+            logger.error(f"[{chunk.campaign_id}] Chunk {chunk.id} failed after {chunk.attempts} attempts")
+            CampaignChunk.objects.filter(pk=chunk.pk).update(status='failed', finished_at=now)
+            finalize_campaign_send.delay(chunk.campaign_id)
+            continue
+
+        reserved = CampaignChunk.objects.filter(pk=chunk.pk, lease_expires_at=chunk.lease_expires_at).update(
+            status='pending',
+            lease_owner='',
+            lease_expires_at=now + timedelta(seconds=settings.EMAIL_CHUNK_LEASE_SECONDS),
+        )
+        if reserved:
+            logger.warning(f"[{chunk.campaign_id}] Requeueing stalled chunk {chunk.id} from membership {chunk.checkpoint_id}")
+            send_campaign_chunk.apply_async((chunk.id,), link=finalize_campaign_send.si(chunk.campaign_id))
+            requeued += 1
+
+    return {'requeued': requeued}
+
+
+@shared_task
+def flush_tracking_events():
+    """Periodic: move buffered open/click events into ``CampaignAnalytics`` in bulk."""
+    from .events import flush_events
+
+    flushed = flush_events()
+    if flushed:
+        logger.info(f"Flushed {flushed} tracking events")
+    return flushed
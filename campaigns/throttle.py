@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Every bucket refills continuously at ``rate`` tokens per second up to
+# ``capacity``. A request for ``n`` tokens succeeds only if every bucket of
+# the account has ``n`` available; otherwise nothing is taken and the
+# longest wait is returned (in milliseconds).
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local requested = tonumber(ARGV[1])
+local wait = 0
+local state = {}
+
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local capacity = tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    state[i] = tokens
+    if tokens < requested then
+        wait = math.max(wait, (requested - tokens) / rate)
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    local tokens = state[i]
+    if wait == 0 then
+        tokens = tokens - requested
+    end
+    local capacity = tonumber(ARGV[i * 2 + 1])
+    local rate = tonumber(ARGV[i * 2])
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 60)
+end
+
+return math.ceil(wait * 1000)
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when the quota will not allow a send within EMAIL_RATE_LIMIT_MAX_WAIT."""
+
+    def __init__(self, account, wait):
+        self.account = account
+        self.wait = wait
+        super().__init__(f"Rate limit for {account} needs a {wait:.0f}s wait")
+
+
+def get_account_limits(account, limits=None):
+    """
+    Return ``[(rate_per_second, capacity), ...]`` buckets for an SMTP
+    account from ``limits`` or ``EMAIL_RATE_LIMITS``, scaled by the headroom
+    factor so the cluster runs just under the provider quota. Limits of 0
+    are unlimited.
+    """
+    limits = limits or settings.EMAIL_RATE_LIMITS.get(account) or settings.EMAIL_RATE_LIMITS['default']
+    headroom = settings.EMAIL_RATE_LIMIT_HEADROOM
+
+    buckets = []
+    if limits.get('per_second'):
+        per_second = limits['per_second'] * headroom
+        buckets.append((per_second, max(1.0, per_second)))
+    if limits.get('per_day'):
+        per_day = limits['per_day'] * headroom
+        buckets.append((per_day / 86400, per_day))
+    return buckets
+
+
+class LocalRateLimiter:
+    """In-process token buckets, used for tests and single-worker setups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def _try_take(self, account, buckets, requested):
+        now = time.monotonic()
+        with self._lock:
+            state = []
+            wait = 0
+            for index, (rate, capacity) in enumerate(buckets):
+                tokens, ts = self._buckets.get((account, index), (capacity, now))
+                tokens = min(capacity, tokens + (now - ts) * rate)
+                state.append(tokens)
+                if tokens < requested:
+                    wait = max(wait, (requested - tokens) / rate)
+
+            for index, tokens in enumerate(state):
+                if not wait:
+                    tokens -= requested
+                self._buckets[(account, index)] = (tokens, now)
+            return wait
+
+
+class RedisRateLimiter:
+    """Token buckets shared by every worker through the Celery Redis broker."""
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def _try_take(self, account, buckets, requested):
+        keys = [f"email-rate:{account}:{index}" for index in range(len(buckets))]
+        args = [requested]
+        for rate, capacity in buckets:
+            args.extend([rate, capacity])
+        return self._script(keys=keys, args=args) / 1000
+
+
+class RateLimiter:
+    """
+    Blocking front end over a token-bucket backend. ``acquire`` waits until
+    ``count`` sends are allowed for the account, taking tokens in pieces no
+    larger than the smallest bucket so large batches are paced rather than
+    refused.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._fallback = LocalRateLimiter()
+
+    def acquire(self, account, count=1, limits=None):
+        buckets = get_account_limits(account, limits)
+        if not buckets:
+            return 0
+
+        piece_size = max(1, int(min(capacity for _, capacity in buckets)))
+        waited = 0
+        remaining = count
+        while remaining > 0:
+            requested = min(piece_size, remaining)
+            wait = self._try_take(account, buckets, requested)
+            if wait > settings.EMAIL_RATE_LIMIT_MAX_WAIT:
+                raise RateLimitExceeded(account, wait)
+            if wait:
+                time.sleep(wait)
+                waited += wait
+                continue
+            remaining -= requested
+        return waited
+
+    def _try_take(self, account, buckets, requested):
+        try:
+            return self.backend._try_take(account, buckets, requested)
+        except Exception as e:
+            if isinstance(self.backend, LocalRateLimiter):
+                raise
+            logger.error(f"Shared rate limiter unavailable, using in-process buckets: {str(e)}")
+            return self._fallback._try_take(account, buckets, requested)
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+    global _limiter
+    if _limiter is None:
+        use_redis = (
+            settings.EMAIL_RATE_LIMIT_BACKEND == 'redis'
+            and settings.CELERY_BROKER_URL.startswith(('redis://', 'rediss://'))
+            and not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False)
+        )
+        backend = RedisRateLimiter(settings.CELERY_BROKER_URL) if use_redis else LocalRateLimiter()
+        _limiter = RateLimiter(backend)
+    return _limiter
+
+
+def get_account_key():
+    """Rate-limit account for the default SMTP settings."""
+    return settings.EMAIL_HOST_USER or settings.EMAIL_HOST or 'default'
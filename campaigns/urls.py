@@ -6,8 +6,10 @@ urlpatterns = [
     path('campaigns/<uuid:campaign_id>/analytics/', views.CampaignAnalyticsView.as_view(), name='campaign_analytics'),
     path('track/open/<uuid:campaign_id>/<uuid:subscriber_id>/', views.track_open, name='track_open'),
     path('track/click/<uuid:campaign_id>/<uuid:subscriber_id>/<path:url>/', views.track_click, name='track_click'),
+    path('track/l/<int:link_id>/<uuid:subscriber_id>/', views.track_link, name='track_link'),
     # Campaign URLs
     path('', views.CampaignListView.as_view(), name='campaign_list'),
+    path('data/', views.CampaignTableView.as_view(), name='campaign_data'),
     path('new/', views.CampaignCreateView.as_view(), name='campaign_create'),
     path('<uuid:pk>/', views.CampaignDetailView.as_view(), name='campaign_detail'),
     path('<uuid:pk>/edit/', views.CampaignUpdateView.as_view(), name='campaign_update'),
@@ -21,9 +23,11 @@ urlpatterns = [
     path('<uuid:pk>/analysis/', views.campaign_analysis, name='campaign_analysis'),
     path('<uuid:pk>/monitor/', views.campaign_monitor, name='campaign_monitor'),
     path('<uuid:pk>/progress/', views.campaign_progress, name='campaign_progress'),
+    path('<uuid:pk>/events/', views.campaign_events, name='campaign_events'),
     
     # Email Template URLs
     path('email-templates/', views.EmailTemplateListView.as_view(), name='emailtemplate_list'),
+    path('email-templates/data/', views.EmailTemplateTableView.as_view(), name='emailtemplate_data'),
     path('email-templates/new/', views.EmailTemplateCreateView.as_view(), name='emailtemplate_create'),
     path('email-templates/<uuid:pk>/delete/', views.EmailTemplateDeleteView.as_view(), name='emailtemplate_delete'),
     path('email-templates/<uuid:pk>/edit/', views.EmailTemplateUpdateView.as_view(), name='emailtemplate_update'),
@@ -1,102 +1,86 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import ListView, CreateView, UpdateView, DetailView, DeleteView
-from django.urls import reverse_lazy
+from django.views.generic import ListView, CreateView, UpdateView, DetailView, DeleteView, TemplateView
+from django.urls import reverse, reverse_lazy
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse
-from .models import Campaign, EmailTemplate, Plugin,CampaignAnalytics
+from .models import Campaign, EmailTemplate, Plugin,CampaignLink,CampaignHourlyStats,CampaignUniqueSketch, SENDING_STATUS
+from django.core.cache import cache
 from .forms import CampaignForm, EmailTemplateForm, PluginForm
+from .events import record_event
+from utils.cursor import CursorTableView
 import logging
 from django.utils import timezone
 from celery.result import AsyncResult
 from django.contrib.auth.decorators import login_required
 logger = logging.getLogger(__name__)
 
-from django.db.models import Count, Q
+from django.db.models import Count, F, Q
 import time
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, Http404
 from django.views.decorators.clickjacking import xframe_options_exempt
 from datetime import datetime
 
 
 @xframe_options_exempt
 def track_open(request, campaign_id, subscriber_id):
-    CampaignAnalytics.objects.create(
-        campaign_id=campaign_id,
-        subscriber_id=subscriber_id,
-        event_type='opened',
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT')
-    )
+    record_event(campaign_id, subscriber_id, 'opened', request)
     # Return transparent 1x1 pixel
     pixel = b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00\x21\xf9\x04\x01\x00\x00\x00\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02\x44\x01\x00\x3b'
     return HttpResponse(pixel, content_type='image/gif')
 
 def track_click(request, campaign_id, subscriber_id, url):
-    CampaignAnalytics.objects.create(
-        campaign_id=campaign_id,
-        subscriber_id=subscriber_id,
-        event_type='clicked',
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT'),
-        clicked_url=url
-    )
+    record_event(campaign_id, subscriber_id, 'clicked', request, clicked_url=url)
+    return HttpResponseRedirect(url)
+
+
+def track_link(request, link_id, subscriber_id):
+    """Click endpoint for links rewritten at send time (see ``campaigns.links``)."""
+    cache_key = f'campaign-link:{link_id}'
+    link = cache.get(cache_key)
+    if link is None:
+        link = CampaignLink.objects.filter(pk=link_id).values_list('campaign_id', 'url').first()
+        if link is None:
+            raise Http404("Unknown link")
+        cache.set(cache_key, link, 60 * 60)
+    campaign_id, url = link
+
+    record_event(campaign_id, subscriber_id, 'clicked', request, clicked_url=url)
     return HttpResponseRedirect(url)
 
 class CampaignAnalyticsView(LoginRequiredMixin, DetailView):
     model = Campaign
     template_name = 'campaigns/campaign_analytics.html'
+    pk_url_kwarg = 'campaign_id'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         campaign = self.object
-        
-        # Basic counts
-        total_sent = campaign.analytics.filter(event_type='sent').count()
-        total_subscribers = campaign.subscribers.count()
-        
+
+        # Counts come from the hourly rollup kept by the tracking event flush.
+        summary = CampaignHourlyStats.summary(campaign, days=7)
+        totals = summary['totals']
+        total_sent = campaign.sent_count
+        total_subscribers = campaign.get_recipient_count()
+
         # Engagement metrics
-        opened_count = campaign.analytics.filter(event_type='opened').count()
-        clicked_count = campaign.analytics.filter(event_type='clicked').count()
-        
+        opened_count = totals['opened']
+        clicked_count = totals['clicked']
+        unique = CampaignUniqueSketch.estimates(campaign)
+
         # Calculate rates
         open_rate = (opened_count / total_sent * 100) if total_sent else 0
         click_rate = (clicked_count / total_sent * 100) if total_sent else 0
         ctr = (clicked_count / opened_count * 100) if opened_count else 0
-        
-        # Timeline data (last 7 days)
-        timeline_data = []
-        for i in range(7):
-            date = timezone.now() - timedelta(days=6-i)
-            day_data = {
-                'date': date.date(),
-                'sent': campaign.analytics.filter(
-                    event_type='sent',
-                    event_time__date=date.date()
-                ).count(),
-                'opened': campaign.analytics.filter(
-                    event_type='opened',
-                    event_time__date=date.date()
-                ).count(),
-                'clicked': campaign.analytics.filter(
-                    event_type='clicked',
-                    event_time__date=date.date()
-                ).count()
-            }
-            timeline_data.append(day_data)
-        
+
         # Top links clicked
-        top_links = campaign.analytics.filter(
-            event_type='clicked'
-        ).exclude(
-            clicked_url__isnull=True
+        top_links = campaign.links.filter(
+            clicks__gt=0
         ).values(
-            'clicked_url'
-        ).annotate(
-            clicks=Count('id')
+            'clicks', clicked_url=F('url')
         ).order_by('-clicks')[:5]
-        
+
         context.update({
             'total_sent': total_sent,
             'total_subscribers': total_subscribers,
@@ -105,9 +89,13 @@ class CampaignAnalyticsView(LoginRequiredMixin, DetailView):
             'open_rate': round(open_rate, 1),
             'click_rate': round(click_rate, 1),
             'ctr': round(ctr, 1),
-            'bounce_count': campaign.analytics.filter(event_type='bounced').count(),
-            'unsubscribe_count': campaign.analytics.filter(event_type='unsubscribed').count(),
-            'timeline_data': timeline_data,
+            'unique_opens': unique['opened'],
+            'unique_clicks': unique['clicked'],
+            'unique_open_rate': round(unique['opened'] / total_sent * 100, 1) if total_sent else 0,
+            'unique_click_rate': round(unique['clicked'] / total_sent * 100, 1) if total_sent else 0,
+            'bounce_count': totals['bounced'],
+            'unsubscribe_count': totals['unsubscribed'],
+            'timeline_data': summary['timeline'],
             'top_links': top_links,
             'devices': self.get_device_breakdown(campaign),
             'locations': self.get_location_data(campaign)
@@ -139,14 +127,35 @@ class CampaignAnalyticsView(LoginRequiredMixin, DetailView):
 # ======================
 # Campaign Views
 # ======================
-class CampaignListView(LoginRequiredMixin, ListView):
-    model = Campaign
+class CampaignListView(LoginRequiredMixin, TemplateView):
+    """Table shell; rows are loaded page by page from ``CampaignTableView``."""
     template_name = 'campaigns/campaign_list.html'
-    context_object_name = 'campaigns'
+
+
+class CampaignTableView(CursorTableView):
+    model = Campaign
+    fields = ('name', 'subject', 'status', 'is_active', 'sent_at', 'created_at')
+    sort_fields = {'name': 'name', 'status': 'status', 'created': 'created_at'}
+    default_sort = '-created'
+    search_fields = ('name', 'subject')
 
     def get_queryset(self):
         return Campaign.objects.filter(owner=self.request.user)
 
+    def filter_queryset(self, queryset):
+        status = self.request.GET.get('status')
+        if status in dict(SENDING_STATUS):
+            queryset = queryset.filter(status=status)
+        return queryset
+
+    def serialize_row(self, row):
+        row['urls'] = {
+            'detail': reverse('campaign:campaign_detail', args=[row['pk']]),
+            'update': reverse('campaign:campaign_update', args=[row['pk']]),
+            'delete': reverse('campaign:campaign_delete', args=[row['pk']]),
+        }
+        return row
+
 
 class CampaignCreateView(LoginRequiredMixin, CreateView):
     model = Campaign
@@ -279,6 +288,7 @@ def campaign_analysis(request, pk):
     sent_count = campaign.sent_count or 0
 
     progress_data = campaign.get_progress_data()
+    progress_data['campaign'] = campaign
     progress_data['recent_activity'] = [
               {
                 'message': 'Batch processed',
@@ -316,13 +326,16 @@ def campaign_monitor(request, pk):
     campaign = get_object_or_404(Campaign, pk=pk, owner=request.user)
     
     total_recipients = campaign.get_recipient_count()
-    queued = max(0, total_recipients - campaign.sent_count - campaign.error_count)
+    delivery = campaign.get_delivery_counts()
+    # Recipients without a ledger row yet are still waiting for their batch.
+    queued = max(0, total_recipients - delivery['sent'] - delivery['deferred'] - delivery['failed'])
     
     monitor_data = {
         'status': campaign.status,
-        'sent_emails': campaign.sent_count,
+        'sent_emails': delivery['sent'],
         'queued_emails': queued,
-        'failed_emails': campaign.error_count,
+        'deferred_emails': delivery['deferred'],
+        'failed_emails': delivery['failed'],
         **campaign.get_rates(),  # Include all rates
         'total_recipients': total_recipients,
         'time_remaining': campaign.calculate_time_remaining(),
@@ -358,6 +371,17 @@ def campaign_progress(request, pk):
             'status': 'error'
         }, status=500)
 
+@login_required
+def campaign_events(request, pk):
+    """
+    Progress stream endpoint. Under ASGI it is answered by
+    ``campaigns.sse.CampaignProgressStream`` before it reaches Django; a
+    WSGI server cannot hold the stream open, so tell the page to poll.
+    """
+    get_object_or_404(Campaign, pk=pk, owner=request.user)
+    return HttpResponse(status=204)
+
+
 def check_campaign_status(request, pk):
     # Get the campaign object
     campaign = get_object_or_404(Campaign, pk=pk)
@@ -421,10 +445,32 @@ class EmailTemplateUpdateView(UpdateView):
     template_name = 'campaigns/emailtemplate_form.html'
     success_url = reverse_lazy('campaign:emailtemplate_list')
 
-class EmailTemplateListView(LoginRequiredMixin, ListView):
-    model = EmailTemplate
+class EmailTemplateListView(LoginRequiredMixin, TemplateView):
+    """Table shell; rows are loaded page by page from ``EmailTemplateTableView``."""
     template_name = 'campaigns/emailtemplate_list.html'
-    context_object_name = 'templates'
+
+
+class EmailTemplateTableView(CursorTableView):
+    model = EmailTemplate
+    # Never the Quill content: the table only shows these columns.
+    fields = ('name', 'subject', 'is_active', 'created_at')
+    sort_fields = {'name': 'name', 'created': 'created_at'}
+    default_sort = '-created'
+    search_fields = ('name', 'subject')
+
+    def filter_queryset(self, queryset):
+        status = self.request.GET.get('status')
+        if status in ('active', 'inactive'):
+            queryset = queryset.filter(is_active=status == 'active')
+        return queryset
+
+    def serialize_row(self, row):
+        row['urls'] = {
+            'update': reverse('campaign:emailtemplate_update', args=[row['pk']]),
+            'delete': reverse('campaign:emailtemplate_delete', args=[row['pk']]),
+            'preview': reverse('campaign:emailtemplate_preview', args=[row['pk']]),
+        }
+        return row
 
 
 class EmailTemplateCreateView(LoginRequiredMixin, CreateView):
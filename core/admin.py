@@ -10,15 +10,21 @@ class SiteLegalAdmin(admin.ModelAdmin):
 
 @admin.register(SMTPSetting)
 class SMTPSettingAdmin(admin.ModelAdmin):
-    list_display = ('default_from_email', 'email_host', 'email_port', 'email_use_tls', 'updated_at')
+    list_display = ('name', 'default_from_email', 'email_host', 'email_port', 'weight', 'rate_per_second', 'is_active', 'updated_at')
+    list_editable = ('weight', 'is_active')
     readonly_fields = ('updated_at',)
     fields = (
+        'name',
+        'is_active',
         'email_host',
         'email_port',
         'email_use_tls',
         'email_host_user',
         'email_host_password',
         'default_from_email',
+        'weight',
+        'rate_per_second',
+        'rate_per_day',
         'updated_at',
     )
 
@@ -6,9 +6,24 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
-        from core.models import SMTPSetting
+        from django.db.models.signals import post_delete, post_save
+        from campaigns.models import Campaign
+        from subscribers.models import Subscriber, SubscriberList
+        from core.models import SiteSetting, SMTPSetting
+        from core.site_settings import invalidate_site_settings
+        from core.stats import invalidate_campaign_stats, invalidate_subscriber_stats
 
-        site_setting = SMTPSetting.objects.first()
+        for signal in (post_save, post_delete):
+            signal.connect(invalidate_site_settings, sender=SiteSetting, dispatch_uid=f'site_settings_{signal is post_save}')
+            signal.connect(invalidate_campaign_stats, sender=Campaign, dispatch_uid=f'dashboard_campaigns_{signal is post_save}')
+            for model in (Subscriber, SubscriberList):
+                signal.connect(
+                    invalidate_subscriber_stats,
+                    sender=model,
+                    dispatch_uid=f'dashboard_{model.__name__}_{signal is post_save}'
+                )
+
+        site_setting = SMTPSetting.objects.filter(is_active=True).first()
         if site_setting:
             settings.EMAIL_HOST = site_setting.email_host
             settings.EMAIL_PORT = site_setting.email_port
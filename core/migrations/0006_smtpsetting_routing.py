@@ -0,0 +1,42 @@
+# Generated by Django 4.1.13 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_sitelegal_options_sitelegal_updated_by'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='smtpsetting',
+            options={'ordering': ['-is_active', '-weight', 'name'], 'verbose_name': 'SMTP Setting', 'verbose_name_plural': 'SMTP Settings'},
+        ),
+        migrations.AddField(
+            model_name='smtpsetting',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='smtpsetting',
+            name='name',
+            field=models.CharField(default='Primary', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='smtpsetting',
+            name='rate_per_day',
+            field=models.PositiveIntegerField(blank=True, help_text='Messages per day allowed by this provider. Blank uses the site default, 0 means no limit.', null=True),
+        ),
+        migrations.AddField(
+            model_name='smtpsetting',
+            name='rate_per_second',
+            field=models.PositiveIntegerField(blank=True, help_text='Messages per second allowed by this provider. Blank uses the site default, 0 means no limit.', null=True),
+        ),
+        migrations.AddField(
+            model_name='smtpsetting',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Relative share of campaign recipients sent through this provider.'),
+        ),
+    ]
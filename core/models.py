@@ -73,6 +73,7 @@ class SiteSetting(models.Model):
 
 class SMTPSetting(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100, default='Primary')
 
     email_host = models.CharField(max_length=255, default='smtp.gmail.com')
     email_port = models.IntegerField(default=587)
@@ -81,11 +82,29 @@ class SMTPSetting(models.Model):
     email_host_password = models.CharField(max_length=255, blank=True, null=True)
     default_from_email = models.EmailField(default='noreply@example.com')
 
+    # Campaign sends are spread across all active providers by weight.
+    is_active = models.BooleanField(default=True)
+    weight = models.PositiveSmallIntegerField(
+        default=1,
+        help_text="Relative share of campaign recipients sent through this provider."
+    )
+    rate_per_second = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Messages per second allowed by this provider. Blank uses the site default, 0 means no limit."
+    )
+    rate_per_day = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Messages per day allowed by this provider. Blank uses the site default, 0 means no limit."
+    )
+
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        ordering = ['-is_active', '-weight', 'name']
         verbose_name = "SMTP Setting"
         verbose_name_plural = "SMTP Settings"
 
     def __str__(self):
-        return f"SMTP Settings ({self.default_from_email})"
\ No newline at end of file
+        return f"{self.name} ({self.default_from_email})"
\ No newline at end of file
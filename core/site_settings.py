@@ -0,0 +1,88 @@
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import SiteSetting
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'site-settings:version'
+
+# Context key -> (SiteSetting field, fallback used when the field is empty).
+_FIELDS = {
+    # General Info
+    'site_name': ('site_name', lambda: settings.SITE_NAME),
+    'tagline': ('tagline', str),
+    'description': ('description', str),
+
+    # Contact Info
+    'email': ('email', lambda: settings.SITE_EMAIL),
+    'mobile': ('mobile', lambda: settings.SITE_MOBILE),
+    'address': ('address', lambda: settings.SITE_ADDRESS),
+
+    # Social Media
+    'facebook': ('facebook', str),
+    'instagram': ('instagram', str),
+    'linkedin': ('linkedin', str),
+    'twitter': ('twitter', str),
+    'youtube': ('youtube', str),
+
+    # SEO
+    'meta_title': ('meta_title', lambda: settings.SITE_NAME),
+    'meta_description': ('meta_description', str),
+    'meta_keywords': ('meta_keywords', str),
+}
+
+# (version stamp, context) for this process.
+_local = (None, None)
+
+
+def _build(setting):
+    context = {
+        key: (getattr(setting, field, None) if setting else None) or default()
+        for key, (field, default) in _FIELDS.items()
+    }
+    # Logo & Favicon
+    context['logo_url'] = setting.logo.url if setting and setting.logo else settings.DEFAULT_LOGO_URL
+    context['favicon_url'] = setting.favicon.url if setting and setting.favicon else settings.DEFAULT_FAVICON_URL
+    return context
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # First process up (or the stamp was evicted): agree on a new one.
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_site_settings():
+    """
+    Template context for the site settings. Kept per process and reloaded
+    only when the version stamp in the shared cache (``CACHES['default']``)
+    changes, so a render normally costs a cache lookup and no queries.
+    """
+    global _local
+    try:
+        version = _current_version()
+    except Exception as e:
+        # Cache unavailable: read the settings as before caching, and keep
+        # the per-process copy as it is until the stamp can be checked again.
+        logger.warning(f"Site settings cache unavailable: {str(e)}")
+        return dict(_build(SiteSetting.objects.first()))
+    cached_version, context = _local
+    if context is None or cached_version != version:
+        context = _build(SiteSetting.objects.first())
+        _local = (version, context)
+    return dict(context)
+
+
+def invalidate_site_settings(sender, **kwargs):
+    """``post_save``/``post_delete`` receiver for ``SiteSetting``: every process reloads on its next render."""
+    try:
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+    except Exception as e:
+        logger.error(f"Could not invalidate cached site settings: {str(e)}")
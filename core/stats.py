@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum
+from django.utils import timezone
+
+from campaigns.models import Campaign, CampaignHourlyStats
+from subscribers.models import Subscriber, SubscriberList
+
+SUBSCRIBER_STATS_KEY = 'dashboard-stats:subscribers'
+
+
+def _campaign_stats_key(owner_id):
+    return f'dashboard-stats:campaigns:{owner_id}'
+
+
+def _rate(part, whole):
+    return round(part / whole * 100, 1) if whole else 0
+
+
+def get_campaign_stats(owner):
+    """
+    Campaign tiles for one owner: one conditional aggregate over their
+    campaigns and one over the analytics rollup, cached for
+    ``DASHBOARD_STATS_TTL`` seconds in the shared default cache, so an
+    invalidation in one process reaches them all.
+    """
+    key = _campaign_stats_key(owner.pk)
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    campaigns = Campaign.objects.filter(owner=owner)
+    counts = campaigns.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        sent=Count('id', filter=Q(sent_at__isnull=False)),
+        emails_sent=Sum('sent_count'),
+    )
+    engagement = CampaignHourlyStats.objects.filter(campaign__owner=owner).aggregate(
+        opened=Sum('count', filter=Q(event_type='opened')),
+        clicked=Sum('count', filter=Q(event_type='clicked')),
+    )
+    emails_sent = counts['emails_sent'] or 0
+
+    stats = {
+        'total_campaigns': counts['total'],
+        'active_campaigns': counts['active'],
+        'sent_campaigns': counts['sent'],
+        'average_open_rate': _rate(engagement['opened'] or 0, emails_sent),
+        'average_click_rate': _rate(engagement['clicked'] or 0, emails_sent),
+        'recent_campaigns': list(campaigns.order_by('-created_at')[:5]),
+        'top_performing_campaign': campaigns.filter(sent_at__isnull=False, sent_count__gt=0).annotate(
+            open_ratio=ExpressionWrapper(F('open_count') * 1.0 / F('sent_count'), output_field=FloatField())
+        ).order_by('-open_ratio', '-sent_at').first(),
+    }
+    cache.set(key, stats, settings.DASHBOARD_STATS_TTL)
+    return stats
+
+
+def get_subscriber_stats():
+    """Subscriber tiles (subscribers are shared by all users), cached like the campaign stats."""
+    stats = cache.get(SUBSCRIBER_STATS_KEY)
+    if stats is not None:
+        return stats
+
+    counts = Subscriber.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        month_ago=Count('id', filter=Q(subscribed_at__lt=timezone.now() - timedelta(days=30))),
+    )
+    stats = {
+        'total_subscribers': counts['total'],
+        'active_subscribers': counts['active'],
+        'subscriber_growth': (
+            round((counts['total'] - counts['month_ago']) / counts['month_ago'] * 100, 1)
+            if counts['month_ago'] else 0
+        ),
+        'recent_subscribers': list(Subscriber.objects.order_by('-subscribed_at')[:5]),
+        'total_lists': SubscriberList.objects.count(),
+    }
+    cache.set(SUBSCRIBER_STATS_KEY, stats, settings.DASHBOARD_STATS_TTL)
+    return stats
+
+
+def get_dashboard_stats(owner):
+    return {**get_campaign_stats(owner), **get_subscriber_stats()}
+
+
+def invalidate_campaign_stats(sender, instance, **kwargs):
+    """``post_save``/``post_delete`` receiver for ``Campaign``."""
+    cache.delete(_campaign_stats_key(instance.owner_id))
+
+
+def invalidate_subscriber_stats(sender, **kwargs):
+    """``post_save``/``post_delete`` receiver for ``Subscriber`` and ``SubscriberList``."""
+    cache.delete(SUBSCRIBER_STATS_KEY)
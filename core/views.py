@@ -4,11 +4,9 @@ from django.shortcuts import render,redirect
 from django.urls import reverse_lazy
 from django.views.generic import TemplateView,UpdateView,CreateView,View,DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count
-from campaigns.models import Campaign
-from subscribers.models import Subscriber, SubscriberList
 from .models import SiteSetting, SMTPSetting,SiteLegal
 from .forms import SiteSettingForm, SMTPSettingForm,SiteLegalForm
+from .stats import get_dashboard_stats
 import smtplib
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -163,41 +161,9 @@ class HomeView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
-            # Optimized queries with aggregation
-            campaigns = Campaign.objects.filter(owner=self.request.user)
-            context.update({
-                'total_campaigns': campaigns.count(),
-                'active_campaigns': campaigns.filter(is_active=True).count(),
-                'sent_campaigns': campaigns.exclude(sent_at=None).count(),
-                'total_subscribers': Subscriber.objects.count(),
-                'active_subscribers': Subscriber.objects.filter(is_active=True).count(),
-                'recent_subscribers': Subscriber.objects.order_by('-subscribed_at')[:5],
-                'total_lists': SubscriberList.objects.count(),
-                # Add engagement metrics
-                'average_open_rate': self.get_average_open_rate(),
-                'average_click_rate': self.get_average_click_rate()
-            })
+            # Cached per owner; see core.stats
+            context.update(get_dashboard_stats(self.request.user))
         return context
-    
-    def get_average_open_rate(self):
-        """Calculate average open rate across all campaigns"""
-        if not self.request.user.is_authenticated:
-            return 0
-        sent_count = Campaign.objects.filter(owner=self.request.user).exclude(sent_at=None).count()
-        if sent_count == 0:
-            return 0
-        # Replace with your actual analytics model query
-        return round((500 / sent_count) * 100, 1)  # Example calculation
-
-    def get_average_click_rate(self):
-        """Calculate average click rate across all campaigns"""
-        if not self.request.user.is_authenticated:
-            return 0
-        sent_count = Campaign.objects.filter(owner=self.request.user).exclude(sent_at=None).count()
-        if sent_count == 0:
-            return 0
-        # Replace with your actual analytics model query
-        return round((150 / sent_count) * 100, 1)  # Example calculation
 
 
 class DashboardView(LoginRequiredMixin, HomeView):
@@ -205,37 +171,8 @@ class DashboardView(LoginRequiredMixin, HomeView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context.update({
-            'campaigns': Campaign.objects.filter(owner=self.request.user)
-                              .order_by('-created_at')[:5],
-            'top_performing_campaign': self.get_top_performing_campaign(),
-            'subscriber_growth': self.get_subscriber_growth()
-        })
+        context['campaigns'] = context['recent_campaigns']
         return context
-    
-    def get_top_performing_campaign(self):
-        """Get the campaign with highest open rate"""
-        # Replace with your actual analytics model query
-        return Campaign.objects.filter(owner=self.request.user, sent_at__isnull=False)\
-                       .order_by('-created_at').first()
-    
-    def get_subscriber_growth(self):
-        """Calculate subscriber growth over last 30 days"""
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        now = timezone.now()
-        last_month = now - timedelta(days=30)
-        
-        current_count = Subscriber.objects.count()
-        previous_count = Subscriber.objects.filter(
-            subscribed_at__lt=last_month
-        ).count()
-        
-        if previous_count == 0:
-            return 0
-        
-        return round(((current_count - previous_count) / previous_count) * 100, 1)
 
 def handler404(request, exception):
     return render(request, '404.html', status=404)
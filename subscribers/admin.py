@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import SubscriberList, Subscriber
+from .models import SubscriberList, Subscriber, ImportJob
+from .search import matching_subscribers
 
 @admin.register(SubscriberList)
 class SubscriberListAdmin(admin.ModelAdmin):
@@ -15,3 +16,16 @@ class SubscriberAdmin(admin.ModelAdmin):
     list_filter = ('is_active', 'subscribed_at', 'unsubscribed_at')
     ordering = ('-subscribed_at',)
     filter_horizontal = ('lists',)  # To manage ManyToMany field nicely in the admin
+
+    def get_search_results(self, request, queryset, search_term):
+        # Email, names and list names, through the search index.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=matching_subscribers(search_term)), False
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'owner', 'subscriber_list', 'status', 'processed_rows', 'added_count', 'updated_count', 'invalid_count', 'created_at')
+    list_filter = ('status', 'created_at')
+    readonly_fields = ('processed_rows', 'added_count', 'updated_count', 'skipped_count', 'duplicate_count', 'invalid_count', 'errors', 'task_id')
+    ordering = ('-created_at',)
@@ -1,8 +1,12 @@
 from django import forms
+from django.core.validators import FileExtensionValidator
 from .models import Subscriber, SubscriberList
 
 class SubscriberImportForm(forms.Form):
-    excel_file = forms.FileField(label='Select Excel file')
+    excel_file = forms.FileField(
+        label='Select Excel or CSV file',
+        validators=[FileExtensionValidator(['xlsx', 'csv'])]
+    )
 
 
 class SubscriberForm(forms.ModelForm):
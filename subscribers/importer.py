@@ -0,0 +1,290 @@
+import csv
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+
+import pandas as pd
+from django.db import transaction
+from django.db.models.functions import Lower
+from openpyxl import load_workbook
+
+from core.stats import invalidate_subscriber_stats
+
+from .models import Subscriber, SubscriberList
+
+# Rows are written in batches of this size: one lookup, one insert and one
+# membership insert per batch.
+BATCH_SIZE = 5000
+
+# Deliberately loose: it only has to reject values that are clearly not an
+# address, and it must run as a single vectorized match.
+EMAIL_PATTERN = r"[^@\s]+@[^@\s]+\.[^@\s.]+"
+EMAIL_MAX_LENGTH = Subscriber._meta.get_field('email').max_length
+NAME_MAX_LENGTH = Subscriber._meta.get_field('first_name').max_length
+
+INACTIVE_VALUES = ('false', '0', 'no', 'n', 'f', 'inactive')
+
+
+class ImportResult(namedtuple('ImportResult', ['added', 'updated', 'skipped', 'duplicates', 'invalid'])):
+    """
+    Row counts of an import; results of several chunks add up with ``+``.
+    ``skipped`` counts subscribers already on file that were left alone
+    because the import does not update existing subscribers.
+    """
+
+    def __new__(cls, added=0, updated=0, skipped=0, duplicates=0, invalid=0):
+        return super().__new__(cls, added, updated, skipped, duplicates, invalid)
+
+    def __add__(self, other):
+        return ImportResult(*(a + b for a, b in zip(self, other)))
+
+    def __str__(self):
+        return (
+            f"{self.added} added, {self.updated} updated, {self.skipped} skipped, "
+            f"{self.duplicates} duplicates, {self.invalid} invalid"
+        )
+
+
+def _is_csv(path):
+    return os.path.splitext(path)[1].lower() == '.csv'
+
+
+@contextmanager
+def _read_rows(path):
+    """
+    ``(header, rows)`` of a CSV or XLSX file, with ``rows`` an iterator of
+    data records. CSV records come from ``csv.reader``, so a quoted field
+    spanning several lines is still one record; blank lines are skipped.
+    """
+    if _is_csv(path):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            yield next(reader, []), (row for row in reader if row)
+        return
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = ['' if value is None else str(value) for value in next(rows, ())]
+        yield header, rows
+    finally:
+        workbook.close()
+
+
+def count_rows(path):
+    """Data rows in a CSV or XLSX file, without loading it; ``None`` if the workbook does not say."""
+    if _is_csv(path):
+        with _read_rows(path) as (header, rows):
+            return sum(1 for row in rows)
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.max_row
+        return rows - 1 if rows else None
+    finally:
+        workbook.close()
+
+
+def iter_frames(path, chunk_size=BATCH_SIZE, start=0):
+    """
+    Yield a CSV or XLSX file as string frames of ``chunk_size`` rows,
+    skipping the first ``start`` data rows, with memory bounded by the chunk
+    size: both are read record by record (``csv.reader``, or an openpyxl
+    ``read_only`` workbook). Frame indexes are data row numbers counted
+    from 0, the same numbering ``start`` and ``count_rows`` use.
+    """
+    with _read_rows(path) as (header, rows):
+        for _ in range(start):
+            if next(rows, None) is None:
+                return
+        chunk = []
+        for row in rows:
+            chunk.append(_pad(row, len(header)))
+            if len(chunk) == chunk_size:
+                yield _frame(chunk, header, start)
+                start += len(chunk)
+                chunk = []
+        if chunk:
+            yield _frame(chunk, header, start)
+
+
+def _pad(row, width):
+    row = tuple(row[:width])
+    return row + ('',) * (width - len(row))
+
+
+def _frame(chunk, header, start):
+    frame = pd.DataFrame.from_records(chunk, columns=header, index=range(start, start + len(chunk)))
+    # XLSX cells come back typed (numbers, booleans, dates); clean them as text like CSV.
+    return frame.astype(str).where(frame.notna(), '')
+
+
+def _text(frame, column, max_length=None):
+    if column not in frame:
+        return pd.Series('', index=frame.index)
+    values = frame[column].fillna('').astype(str).str.strip()
+    return values.str.slice(0, max_length) if max_length else values
+
+
+def normalize_frame(frame):
+    """
+    Clean a frame of subscriber rows with vectorized operations.
+
+    Returns ``(rows, invalid, duplicates)``: the valid, deduplicated rows
+    with ``email`` (stripped and lower-cased), ``raw_email``,
+    ``first_name``, ``last_name``, ``is_active`` and ``lists`` columns,
+    the rejected addresses (as written, indexed like ``frame``) and the
+    number of duplicate rows dropped. The first occurrence of an address
+    wins.
+    """
+    frame = frame.rename(columns=lambda column: str(column).strip().lower())
+    if 'email' not in frame:
+        raise ValueError("The file must have an 'email' column.")
+
+    raw_email = _text(frame, 'email')
+    email = raw_email.str.lower()
+    valid = email.str.fullmatch(EMAIL_PATTERN) & (email.str.len() <= EMAIL_MAX_LENGTH)
+    unique = valid & ~email.where(valid).duplicated()
+
+    rows = pd.DataFrame({
+        'email': email,
+        'raw_email': raw_email,
+        'first_name': _text(frame, 'first_name', NAME_MAX_LENGTH),
+        'last_name': _text(frame, 'last_name', NAME_MAX_LENGTH),
+        'is_active': ~_text(frame, 'is_active').str.lower().isin(INACTIVE_VALUES),
+        'lists': _text(frame, 'lists'),
+    })[unique]
+
+    invalid = raw_email[~valid]
+    return rows, invalid, len(frame) - len(invalid) - len(rows)
+
+
+class SubscriberImporter:
+    """
+    Set-based subscriber import: per batch, existing subscribers are found
+    with one ``email IN (...)`` lookup, new ones are inserted with
+    ``bulk_create(ignore_conflicts=True)`` and list memberships go into the
+    M2M table in one more bulk insert.
+
+    Every row joins ``subscriber_list`` when given, plus the comma-separated
+    list names in its ``lists`` column, which are created on first use. With
+    ``update_existing`` the names and active flag of subscribers already on
+    file are overwritten from the row; otherwise they are left alone.
+    """
+
+    def __init__(self, subscriber_list=None, update_existing=False, batch_size=BATCH_SIZE, max_errors=0):
+        self.subscriber_list = subscriber_list
+        self.update_existing = update_existing
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.result = ImportResult()
+        # The first ``max_errors`` rejected rows, with their line in the file.
+        self.errors = []
+        self._list_ids = {}
+
+    def import_frame(self, frame):
+        """
+        Import one frame and return its counts (also added to ``self.result``).
+        Duplicates are only detected within the frame: an address repeated in
+        a later frame is counted as updated (or skipped).
+        """
+        rows, invalid, duplicates = normalize_frame(frame)
+        self._record_errors(invalid)
+        result = ImportResult(invalid=len(invalid), duplicates=duplicates)
+        for start in range(0, len(rows), self.batch_size):
+            result += self._write(rows.iloc[start:start + self.batch_size])
+        self.result += result
+        # bulk_create sends no post_save, so refresh the dashboard tiles here.
+        invalidate_subscriber_stats(sender=Subscriber)
+        return result
+
+    def _record_errors(self, invalid):
+        for index, email in invalid.head(self.max_errors - len(self.errors)).items():
+            self.errors.append({
+                # Frame indexes count data rows from 0; line 1 is the header.
+                'row': int(index) + 2,
+                'email': email,
+                'error': 'Invalid email address' if email else 'Missing email address',
+            })
+
+    def _write(self, rows):
+        with transaction.atomic():
+            # Compare lower-cased, so subscribers stored with mixed-case
+            # addresses before emails were lower-cased still match.
+            existing = {
+                email: pk
+                for pk, email in Subscriber.objects.annotate(email_lower=Lower('email')).filter(
+                    email_lower__in=list(rows['email'])
+                ).values_list('pk', 'email_lower')
+            }
+
+            new = rows[~rows['email'].isin(existing)]
+            created = Subscriber.objects.bulk_create(
+                [
+                    Subscriber(
+                        email=row.email,
+                        first_name=row.first_name,
+                        last_name=row.last_name,
+                        is_active=row.is_active,
+                    )
+                    for row in new.itertuples(index=False)
+                ],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            # Rows that lost an insert race keep their generated pk, so read the real ones back.
+            created_ids = {subscriber.pk for subscriber in created}
+            ids = dict(existing)
+            if len(new):
+                ids.update(Subscriber.objects.filter(email__in=list(new['email'])).values_list('email', 'pk'))
+            added = len(created_ids.intersection(ids.values()))
+
+            if self.update_existing:
+                matched = rows[rows['email'].isin(existing)]
+                Subscriber.objects.bulk_update(
+                    [
+                        Subscriber(
+                            pk=existing[row.email],
+                            first_name=row.first_name,
+                            last_name=row.last_name,
+                            is_active=row.is_active,
+                        )
+                        for row in matched.itertuples(index=False)
+                    ],
+                    ['first_name', 'last_name', 'is_active'],
+                    batch_size=1000,
+                )
+
+            self._add_memberships(rows, ids)
+
+        on_file = len(rows) - added
+        if self.update_existing:
+            return ImportResult(added=added, updated=on_file)
+        return ImportResult(added=added, skipped=on_file)
+
+    def _add_memberships(self, rows, ids):
+        names = rows['lists'].str.split(',').explode().str.strip()
+        names = names[names.fillna('') != '']
+        list_ids = self._resolve_lists(names.unique())
+
+        Membership = Subscriber.lists.through
+        pairs = {(ids[rows.at[index, 'email']], list_ids[name]) for index, name in names.items()}
+        if self.subscriber_list is not None:
+            pairs.update((subscriber_id, self.subscriber_list.pk) for subscriber_id in ids.values())
+        Membership.objects.bulk_create(
+            [Membership(subscriber_id=subscriber_id, subscriberlist_id=list_id) for subscriber_id, list_id in pairs],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+    def _resolve_lists(self, names):
+        """Map list names to ids, creating the lists that do not exist yet."""
+        missing = [name for name in names if name not in self._list_ids]
+        if missing:
+            for pk, name in SubscriberList.objects.filter(name__in=missing).order_by('-created_at').values_list('pk', 'name'):
+                # Oldest list wins when several share a name.
+                self._list_ids[name] = pk
+            new_lists = [SubscriberList(name=name) for name in missing if name not in self._list_ids]
+            SubscriberList.objects.bulk_create(new_lists)
+            self._list_ids.update((subscriber_list.name, subscriber_list.pk) for subscriber_list in new_lists)
+        return self._list_ids
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscribers', '0001_initial'),
+    ]
+
+    # Campaign sends page through a list's memberships with
+    # "subscriberlist_id = X AND id > last_id ORDER BY id", which needs a
+    # composite index on the auto-created M2M table.
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX subscribers_subscriber_lists_keyset '
+                'ON subscribers_subscriber_lists (subscriberlist_id, id)',
+            reverse_sql='DROP INDEX subscribers_subscriber_lists_keyset',
+        ),
+    ]
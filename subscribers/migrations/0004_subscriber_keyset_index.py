@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscribers', '0003_import_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscriber',
+            index=models.Index(fields=['subscribed_at', 'id'], name='subscriber_subscribed_keyset'),
+        ),
+    ]
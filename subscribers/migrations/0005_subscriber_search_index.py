@@ -0,0 +1,158 @@
+from django.db import migrations
+
+# Search index for subscribers.search, built per database vendor:
+#
+# - PostgreSQL: pg_trgm GIN indexes on the subscriber document expression
+#   (email, first and last name) and on list names. ILIKE '%x%' and
+#   word_similarity() use them, and PostgreSQL keeps them up to date itself.
+# - SQLite: an FTS5 table with the trigram tokenizer over a document table
+#   holding one row per subscriber (email, names and the names of their
+#   lists). Triggers on the subscriber, list and membership tables keep the
+#   documents in sync; the FTS5 index follows the documents as external
+#   content. The document table has an INTEGER PRIMARY KEY, so FTS rowids
+#   survive VACUUM. The trigram tokenizer needs SQLite 3.34.
+#
+# Other databases (and older SQLite) get no index and search falls back to LIKE.
+
+POSTGRESQL_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX subscriber_search_trgm ON subscribers_subscriber "
+    "USING gin ((email || ' ' || first_name || ' ' || last_name) gin_trgm_ops)",
+    "CREATE INDEX subscriberlist_name_trgm ON subscribers_subscriberlist USING gin (name gin_trgm_ops)",
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP INDEX IF EXISTS subscriberlist_name_trgm",
+    "DROP INDEX IF EXISTS subscriber_search_trgm",
+]
+
+_SQLITE_LIST_NAMES = """
+    (SELECT COALESCE(group_concat(l.name, ' '), '')
+     FROM subscribers_subscriber_lists m
+     JOIN subscribers_subscriberlist l ON l.id = m.subscriberlist_id
+     WHERE m.subscriber_id = {subscriber_id})
+"""
+
+SQLITE_FORWARD = [
+    """
+    CREATE TABLE subscribers_search_document (
+        id INTEGER PRIMARY KEY,
+        subscriber_id char(32) NOT NULL UNIQUE,
+        email TEXT NOT NULL,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        list_names TEXT NOT NULL DEFAULT ''
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE subscribers_search USING fts5(
+        email, first_name, last_name, list_names,
+        content='subscribers_search_document', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    # Documents -> FTS index (external content).
+    """
+    CREATE TRIGGER subscribers_search_document_ai AFTER INSERT ON subscribers_search_document BEGIN
+        INSERT INTO subscribers_search (rowid, email, first_name, last_name, list_names)
+        VALUES (NEW.id, NEW.email, NEW.first_name, NEW.last_name, NEW.list_names);
+    END
+    """,
+    """
+    CREATE TRIGGER subscribers_search_document_ad AFTER DELETE ON subscribers_search_document BEGIN
+        INSERT INTO subscribers_search (subscribers_search, rowid, email, first_name, last_name, list_names)
+        VALUES ('delete', OLD.id, OLD.email, OLD.first_name, OLD.last_name, OLD.list_names);
+    END
+    """,
+    """
+    CREATE TRIGGER subscribers_search_document_au AFTER UPDATE ON subscribers_search_document BEGIN
+        INSERT INTO subscribers_search (subscribers_search, rowid, email, first_name, last_name, list_names)
+        VALUES ('delete', OLD.id, OLD.email, OLD.first_name, OLD.last_name, OLD.list_names);
+        INSERT INTO subscribers_search (rowid, email, first_name, last_name, list_names)
+        VALUES (NEW.id, NEW.email, NEW.first_name, NEW.last_name, NEW.list_names);
+    END
+    """,
+    # Subscribers -> documents.
+    """
+    CREATE TRIGGER subscribers_subscriber_search_ai AFTER INSERT ON subscribers_subscriber BEGIN
+        INSERT INTO subscribers_search_document (subscriber_id, email, first_name, last_name)
+        VALUES (NEW.id, NEW.email, NEW.first_name, NEW.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER subscribers_subscriber_search_au AFTER UPDATE OF email, first_name, last_name ON subscribers_subscriber BEGIN
+        UPDATE subscribers_search_document
+        SET email = NEW.email, first_name = NEW.first_name, last_name = NEW.last_name
+        WHERE subscriber_id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER subscribers_subscriber_search_ad AFTER DELETE ON subscribers_subscriber BEGIN
+        DELETE FROM subscribers_search_document WHERE subscriber_id = OLD.id;
+    END
+    """,
+    # Memberships and list names -> documents.
+    """
+    CREATE TRIGGER subscribers_subscriber_lists_search_ai AFTER INSERT ON subscribers_subscriber_lists BEGIN
+        UPDATE subscribers_search_document SET list_names = %s WHERE subscriber_id = NEW.subscriber_id;
+    END
+    """ % _SQLITE_LIST_NAMES.format(subscriber_id='NEW.subscriber_id'),
+    """
+    CREATE TRIGGER subscribers_subscriber_lists_search_ad AFTER DELETE ON subscribers_subscriber_lists BEGIN
+        UPDATE subscribers_search_document SET list_names = %s WHERE subscriber_id = OLD.subscriber_id;
+    END
+    """ % _SQLITE_LIST_NAMES.format(subscriber_id='OLD.subscriber_id'),
+    """
+    CREATE TRIGGER subscribers_subscriberlist_search_au AFTER UPDATE OF name ON subscribers_subscriberlist BEGIN
+        UPDATE subscribers_search_document SET list_names = %s
+        WHERE subscriber_id IN (
+            SELECT subscriber_id FROM subscribers_subscriber_lists WHERE subscriberlist_id = NEW.id
+        );
+    END
+    """ % _SQLITE_LIST_NAMES.format(subscriber_id='subscribers_search_document.subscriber_id'),
+    # Existing subscribers.
+    """
+    INSERT INTO subscribers_search_document (subscriber_id, email, first_name, last_name, list_names)
+    SELECT s.id, s.email, s.first_name, s.last_name, %s
+    FROM subscribers_subscriber s
+    """ % _SQLITE_LIST_NAMES.format(subscriber_id='s.id'),
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS subscribers_subscriberlist_search_au",
+    "DROP TRIGGER IF EXISTS subscribers_subscriber_lists_search_ad",
+    "DROP TRIGGER IF EXISTS subscribers_subscriber_lists_search_ai",
+    "DROP TRIGGER IF EXISTS subscribers_subscriber_search_ad",
+    "DROP TRIGGER IF EXISTS subscribers_subscriber_search_au",
+    "DROP TRIGGER IF EXISTS subscribers_subscriber_search_ai",
+    "DROP TABLE IF EXISTS subscribers_search",
+    "DROP TABLE IF EXISTS subscribers_search_document",
+]
+
+
+def _statements(connection):
+    if connection.vendor == 'postgresql':
+        return POSTGRESQL_FORWARD, POSTGRESQL_REVERSE
+    if connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 34):
+        return SQLITE_FORWARD, SQLITE_REVERSE
+    return [], []
+
+
+def create_search_index(apps, schema_editor):
+    for statement in _statements(schema_editor.connection)[0]:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in _statements(schema_editor.connection)[1]:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscribers', '0004_subscriber_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscribers', '0005_subscriber_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='skipped_count',
+            field=models.PositiveIntegerField(default=0, help_text='Subscribers already on file, left alone because update_existing is off.'),
+        ),
+    ]
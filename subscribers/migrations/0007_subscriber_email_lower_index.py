@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:42
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscribers', '0006_importjob_skipped_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscriber',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='subscriber_email_lower'),
+        ),
+    ]
@@ -5,6 +5,8 @@ import uuid
 from django.db import models
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.db.models.functions import Lower
 
 class SubscriberList(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -28,6 +30,14 @@ class Subscriber(models.Model):
     unsubscribed_at = models.DateTimeField(null=True, blank=True)
     lists = models.ManyToManyField(SubscriberList, related_name='subscribers')
 
+    class Meta:
+        indexes = [
+            # Keyset pages of the subscriber table, newest first.
+            models.Index(fields=['subscribed_at', 'id'], name='subscriber_subscribed_keyset'),
+            # Case-insensitive address lookups of the importer.
+            models.Index(Lower('email'), name='subscriber_email_lower'),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -40,4 +50,76 @@ class Subscriber(models.Model):
     def unsubscribe(self):
         self.is_active = False
         self.unsubscribed_at = timezone.now()
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+class ImportJob(models.Model):
+    """
+    A subscriber import running in the background.
+
+    The upload is spooled to ``file`` and read in chunks by the
+    ``run_import_job`` task. ``processed_rows`` is the checkpoint: it is
+    saved with the counts in the same transaction as each chunk, so a
+    retried, redelivered or continued task resumes after the last
+    committed chunk.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='import_jobs')
+    subscriber_list = models.ForeignKey(
+        SubscriberList, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs',
+        help_text="List every imported subscriber joins, besides the lists named in the file."
+    )
+    update_existing = models.BooleanField(default=False, help_text="Overwrite names and status of subscribers already on file.")
+    file = models.FileField(upload_to='imports/')
+    file_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    task_id = models.CharField(max_length=255, blank=True)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    added_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0, help_text="Subscribers already on file, left alone because update_existing is off.")
+    duplicate_count = models.PositiveIntegerField(default=0)
+    invalid_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="The first rejected rows: row number, email and reason.")
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.file_name} - {self.status}"
+
+    def get_progress_percentage(self):
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.processed_rows * 100 // self.total_rows)
+
+    def get_progress_data(self):
+        return {
+            'status': self.status,
+            'file_name': self.file_name,
+            'progress_percentage': self.get_progress_percentage(),
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'added_count': self.added_count,
+            'updated_count': self.updated_count,
+            'skipped_count': self.skipped_count,
+            'duplicate_count': self.duplicate_count,
+            'invalid_count': self.invalid_count,
+            'errors': self.errors,
+            'error_message': self.error_message,
+            'timestamp': timezone.now().isoformat(),
+        }
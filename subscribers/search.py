@@ -0,0 +1,198 @@
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from utils.cursor import decode_cursor, encode_cursor
+
+from .models import Subscriber
+
+DEFAULT_LIMIT = 25
+
+# Trigram indexes cannot look up anything shorter than a trigram.
+MIN_TERM_LENGTH = 3
+
+SearchPage = namedtuple('SearchPage', ['results', 'next'])
+
+_PG_LIST_MEMBERS = """
+    SELECT m.subscriber_id FROM subscribers_subscriber_lists m
+    JOIN subscribers_subscriberlist l ON l.id = m.subscriberlist_id
+    WHERE l.name ILIKE %s
+"""
+
+_SQLITE_DOCUMENT = "(d.email || ' ' || d.first_name || ' ' || d.last_name || ' ' || d.list_names)"
+
+
+def _pg_document(alias=''):
+    """The expression of the subscriber_search_trgm index (migration 0005)."""
+    prefix = f'{alias}.' if alias else ''
+    return f"({prefix}email || ' ' || {prefix}first_name || ' ' || {prefix}last_name)"
+
+
+def _backend():
+    """The search index built by migration 0005 for this database, if any."""
+    if connection.vendor == 'postgresql':
+        return 'trigram'
+    if connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 34):
+        return 'fts5'
+    return None
+
+
+def _terms(query):
+    terms = query.split()
+    return [t for t in terms if len(t) >= MIN_TERM_LENGTH], [t for t in terms if len(t) < MIN_TERM_LENGTH]
+
+
+def _like_pattern(term):
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _fts5_sql(query, terms, short_terms, ranked):
+    # Every term is a quoted phrase, so FTS5 syntax in the query is taken
+    # literally and each term must occur, as a substring, in some column.
+    match = ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+    params = []
+    select = 'd.subscriber_id AS id'
+    if ranked:
+        # bm25() is lower for better matches; email prefixes go first.
+        select += (
+            ", bm25(subscribers_search, 10.0, 2.0, 2.0, 1.0)"
+            " - CASE WHEN instr(lower(d.email), lower(%s)) = 1 THEN 1000 ELSE 0 END AS score"
+        )
+        params.append(query)
+    sql = (
+        f"SELECT {select} FROM subscribers_search "
+        "JOIN subscribers_search_document d ON d.id = subscribers_search.rowid "
+        "WHERE subscribers_search MATCH %s"
+    )
+    params.append(match)
+    for term in short_terms:
+        sql += f" AND instr(lower({_SQLITE_DOCUMENT}), lower(%s)) > 0"
+        params.append(term)
+    return sql, params
+
+
+def _trigram_sql(query, terms, short_terms, ranked):
+    # One index-backed branch per term: the subscriber document, or the name
+    # of a list the subscriber is on. A subscriber must match every term.
+    branches, params = [], []
+    for term in terms:
+        branches.append(f"(SELECT id FROM subscribers_subscriber WHERE {_pg_document()} ILIKE %s UNION {_PG_LIST_MEMBERS})")
+        params += [_like_pattern(term)] * 2
+    select = 's.id'
+    if ranked:
+        # Negated so that, as on SQLite, a lower score is a better match.
+        select += (
+            ", -(CASE WHEN strpos(lower(s.email), lower(%s)) = 1 THEN 1 ELSE 0 END"
+            f" + word_similarity(%s, {_pg_document('s')})) AS score"
+        )
+        params = [query, query] + params
+    sql = f"SELECT {select} FROM subscribers_subscriber s WHERE s.id IN ({' INTERSECT '.join(branches)})"
+    for term in short_terms:
+        sql += (
+            f" AND ({_pg_document('s')} ILIKE %s"
+            f" OR s.id IN ({_PG_LIST_MEMBERS}))"
+        )
+        params += [_like_pattern(term)] * 2
+    return sql, params
+
+
+def _index_sql(query, ranked=False):
+    """
+    ``SELECT id[, score]`` of the subscribers matching ``query`` through the
+    search index, or ``None`` when the index cannot answer it.
+    """
+    backend = _backend()
+    terms, short_terms = _terms(query)
+    if backend is None or not terms:
+        return None
+    build = _fts5_sql if backend == 'fts5' else _trigram_sql
+    return build(query, terms, short_terms, ranked)
+
+
+def _lookup_filter(query):
+    """The same match as the index, as a plain (unindexed) filter."""
+    terms, short_terms = _terms(query)
+    if not terms:
+        return Q(email__istartswith=query)
+    condition = Q()
+    for term in terms + short_terms:
+        condition &= (
+            Q(email__icontains=term)
+            | Q(first_name__icontains=term)
+            | Q(last_name__icontains=term)
+            | Q(pk__in=Subscriber.lists.through.objects.filter(
+                subscriberlist__name__icontains=term
+            ).values('subscriber_id'))
+        )
+    return condition
+
+
+def matching_subscribers(query):
+    """
+    Ids of the subscribers matching ``query``, unranked, for use in a
+    ``pk__in`` / ``subscriber_id__in`` filter.
+    """
+    query = query.strip()
+    index_sql = _index_sql(query)
+    if index_sql is None:
+        return Subscriber.objects.filter(_lookup_filter(query)).values('pk')
+    return RawSQL(*index_sql)
+
+
+def search_subscribers(query, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    One page of the subscribers matching ``query``, best matches first.
+
+    Each whitespace-separated term must occur in the subscriber's email,
+    first name, last name or the name of one of their lists, anywhere in
+    the value. Subscribers whose email starts with the query rank first,
+    then by relevance: BM25 over the FTS5 trigram index on SQLite,
+    ``word_similarity`` over the pg_trgm indexes on PostgreSQL.
+
+    Pages are keyset paginated on ``(score, id)``; pass the ``next`` of a
+    page as ``cursor`` for the following one. Raises ``InvalidCursor``.
+    Queries with no term of three characters or more, and databases
+    without the index, are matched with ``LIKE`` instead and ordered by
+    email.
+    """
+    query = query.strip()
+    if not query:
+        return SearchPage([], None)
+    pk = Subscriber._meta.pk
+    index_sql = _index_sql(query, ranked=True)
+
+    if index_sql is None:
+        queryset = Subscriber.objects.filter(_lookup_filter(query))
+        if cursor:
+            email, after = decode_cursor(cursor, [Subscriber._meta.get_field('email'), pk])
+            queryset = queryset.filter(Q(email__gt=email) | Q(email=email, pk__gt=after))
+        results = list(queryset.order_by('email', 'pk')[:limit + 1])
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_cursor = encode_cursor([results[-1].email, results[-1].pk])
+        return SearchPage(results, next_cursor)
+
+    sql, params = index_sql
+    sql = f"SELECT id, score FROM ({sql}) ranked"
+    if cursor:
+        score, after = decode_cursor(cursor, [FloatField(), pk])
+        after = pk.get_db_prep_value(after, connection)
+        sql += " WHERE score > %s OR (score = %s AND id > %s)"
+        params += [score, score, after]
+    sql += " ORDER BY score, id LIMIT %s"
+    params.append(limit + 1)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        ranked = [(pk.to_python(row[0]), row[1]) for row in db_cursor.fetchall()]
+
+    next_cursor = None
+    if len(ranked) > limit:
+        ranked = ranked[:limit]
+        next_cursor = encode_cursor([ranked[-1][1], ranked[-1][0]])
+    subscribers = Subscriber.objects.in_bulk([subscriber_id for subscriber_id, score in ranked])
+    # A subscriber deleted since the ids were read is left out.
+    results = [subscribers[subscriber_id] for subscriber_id, score in ranked if subscriber_id in subscribers]
+    return SearchPage(results, next_cursor)
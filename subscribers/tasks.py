@@ -0,0 +1,87 @@
+import time
+import uuid
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .importer import SubscriberImporter, count_rows, iter_frames
+from .models import ImportJob
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def run_import_job(self, job_id):
+    """
+    Import a spooled upload chunk by chunk. Each chunk is written in one
+    transaction together with the job's checkpoint and counts, so memory
+    stays bounded by ``IMPORT_CHUNK_SIZE`` and a redelivered task picks up
+    after the last committed chunk. After ``IMPORT_TASK_TIME_BUDGET``
+    seconds the job is handed to a fresh task, which keeps multi-million
+    row files clear of the Celery time limits. Only the task whose id is on
+    the job may work on it.
+    """
+    job = ImportJob.objects.select_related('subscriber_list').filter(pk=job_id).first()
+    if job is None or job.status in ('done', 'failed'):
+        return
+    if job.status == 'running' and job.task_id != self.request.id:
+        logger.info(f"[import {job_id}] Owned by task {job.task_id}, skipping")
+        return
+
+    deadline = time.monotonic() + settings.IMPORT_TASK_TIME_BUDGET
+    try:
+        if job.status == 'pending':
+            job.status = 'running'
+            job.task_id = self.request.id
+            job.started_at = timezone.now()
+            job.total_rows = count_rows(job.file.path)
+            job.save(update_fields=['status', 'task_id', 'started_at', 'total_rows'])
+
+        importer = SubscriberImporter(
+            subscriber_list=job.subscriber_list,
+            update_existing=job.update_existing,
+            batch_size=settings.IMPORT_CHUNK_SIZE,
+            max_errors=max(settings.IMPORT_MAX_ERRORS - len(job.errors), 0),
+        )
+        for frame in iter_frames(job.file.path, settings.IMPORT_CHUNK_SIZE, start=job.processed_rows):
+            with transaction.atomic():
+                errors = len(importer.errors)
+                result = importer.import_frame(frame)
+                job.processed_rows += len(frame)
+                job.added_count += result.added
+                job.updated_count += result.updated
+                job.skipped_count += result.skipped
+                job.duplicate_count += result.duplicates
+                job.invalid_count += result.invalid
+                job.errors = job.errors + importer.errors[errors:]
+                job.save(update_fields=[
+                    'processed_rows', 'added_count', 'updated_count', 'skipped_count',
+                    'duplicate_count', 'invalid_count', 'errors',
+                ])
+
+            if time.monotonic() > deadline:
+                task_id = str(uuid.uuid4())
+                job.task_id = task_id
+                job.save(update_fields=['task_id'])
+                logger.info(f"[import {job_id}] Continuing after row {job.processed_rows} in task {task_id}")
+                run_import_job.apply_async((job_id,), task_id=task_id)
+                return {'processed_rows': job.processed_rows, 'continued': True}
+
+        job.status = 'done'
+        job.total_rows = job.processed_rows
+        job.finished_at = timezone.now()
+        job.file.delete(save=False)
+        job.save(update_fields=['status', 'total_rows', 'finished_at', 'file'])
+        logger.info(f"[import {job_id}] Done: {importer.result} in this run, {job.processed_rows} rows in total")
+        return {'processed_rows': job.processed_rows, 'continued': False}
+
+    except Exception as e:
+        logger.error(f"[import {job_id}] Failed after row {job.processed_rows}: {str(e)}", exc_info=True)
+        ImportJob.objects.filter(pk=job_id).update(
+            status='failed',
+            error_message=str(e),
+            finished_at=timezone.now()
+        )
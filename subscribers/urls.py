@@ -9,17 +9,23 @@ urlpatterns = [
 
     path('subscriber-lists/export/', views.export_subscriber_lists, name='export_subscriber_lists'),
     path('subscriber-lists/import/', views.import_subscriber_lists, name='import_subscriber_lists'),
+    path('import-jobs/<uuid:pk>/', views.ImportJobDetailView.as_view(), name='import_job_detail'),
+    path('import-jobs/<uuid:pk>/progress/', views.import_job_progress, name='import_job_progress'),
      path('list/import-subscribers/', views.SubscriberImportView.as_view(), name='import_subscribers_lists'),
 
     path('', views.SubscriberListView.as_view(), name='subscriber_list'),
+    path('data/', views.SubscriberTableView.as_view(), name='subscriber_data'),
+    path('search/', views.subscriber_search, name='subscriber_search'),
     path('new/', views.SubscriberCreateView.as_view(), name='subscriber_create'),
     path('<uuid:pk>/edit/', views.SubscriberUpdateView.as_view(), name='subscriber_update'),
     path('<uuid:pk>/delete/', views.SubscriberDeleteView.as_view(), name='subscriber_delete'),
     
     path('lists/', views.SubscriberListListView.as_view(), name='subscriberlist_list'),
+    path('lists/data/', views.SubscriberListTableView.as_view(), name='subscriberlist_data'),
     path('lists/new/', views.SubscriberListCreateView.as_view(), name='subscriberlist_create'),
     path('lists/<uuid:pk>/', views.SubscriberListDetailView.as_view(), name='subscriberlist_detail'),
     path('lists/<uuid:pk>/edit/', views.SubscriberListUpdateView.as_view(), name='subscriberlist_update'),
     path('lists/<uuid:pk>/delete/', views.SubscriberListDeleteView.as_view(), name='subscriberlist_delete'),
+    path('unsubscribe/<uuid:campaign_id>/<str:token>/', views.TokenUnsubscribeView.as_view(), name='unsubscribe_token'),
     path('unsubscribe/<str:signed_email>/', views.UnsubscribeView.as_view(), name='unsubscribe'),
 ]
\ No newline at end of file
@@ -1,16 +1,26 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView,DetailView
-from django.urls import reverse_lazy
-from .models import SubscriberList, Subscriber
+from django.contrib.auth.decorators import login_required
+from django.views.generic import CreateView, UpdateView, DeleteView,DetailView
+from django.urls import reverse, reverse_lazy
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import SubscriberList, Subscriber, ImportJob
 from .forms import SubscriberListForm, SubscriberForm,SubscriberImportForm
 from django.core.signing import Signer, BadSignature
 from django.shortcuts import get_object_or_404, redirect,render
 from django.contrib import messages
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, View
+from django.utils import timezone
 from .models import Subscriber
+from .tokens import check_unsubscribe_token
+from .tasks import run_import_job
+from .exporter import EXPORT_FORMATS, ListNames, export_response, export_rows
+from .search import matching_subscribers, search_subscribers
+from utils.cursor import CursorTableView, InvalidCursor, MAX_PAGE_SIZE
+from campaigns.events import record_event
 import uuid
-import pandas as pd
-from django.http import HttpResponse
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.db import transaction
 from django.core.signing import TimestampSigner, BadSignature
 from urllib.parse import  unquote
 
@@ -20,162 +30,132 @@ class SubscriberImportView(TemplateView):
 
 
 
-def export_subscriber_lists(request):
-    # Retrieve all subscribers
-    subscribers = Subscriber.objects.all()
-
-    # Prepare data to export
-    data = []
-    for subscriber in subscribers:
-        lists = [list.name for list in subscriber.lists.all()]  # Get names of all lists the subscriber is part of
-        
-        data.append({
-            'email': subscriber.email,
-            'first_name': subscriber.first_name or 'Not provided',
-            'last_name': subscriber.last_name or 'Not provided',
-            'subscribed_at': subscriber.subscribed_at.strftime('%Y-%m-%d %H:%M:%S') if subscriber.subscribed_at else '',
-            'unsubscribed_at': subscriber.unsubscribed_at.strftime('%Y-%m-%d %H:%M:%S') if subscriber.unsubscribed_at else '',
-            'is_active': subscriber.is_active,
-            'subscriber_lists': ', '.join(lists),  # Join the list names into a single string
-        })
-
-    # Create a DataFrame from the data
-    df = pd.DataFrame(data)
-
-    # Create an HTTP response to download the Excel file
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename=subscriber_lists_export.xlsx'
-
-    # Use Pandas ExcelWriter to write the DataFrame to the response
-    with pd.ExcelWriter(response, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-
-    return response
-
+def _export_format(request):
+    file_format = request.GET.get('format', 'xlsx')
+    return file_format if file_format in EXPORT_FORMATS else None
 
 
+def export_subscriber_lists(request):
+    file_format = _export_format(request)
+    if file_format is None:
+        return HttpResponseBadRequest(f"Unsupported export format; use one of: {', '.join(EXPORT_FORMATS)}")
+
+    def rows():
+        for row in export_rows():
+            row['first_name'] = row['first_name'] or 'Not provided'
+            row['last_name'] = row['last_name'] or 'Not provided'
+            yield row
+
+    columns = [
+        ('email', 'email'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('subscribed_at', 'subscribed_at'),
+        ('unsubscribed_at', 'unsubscribed_at'),
+        ('is_active', 'is_active'),
+        ('subscriber_lists', 'lists'),
+    ]
+    return export_response(rows(), columns, 'subscriber_lists_export', file_format)
+
+
+
+IMPORT_EXTENSIONS = ('.csv', '.xlsx')
+
+
+def start_import_job(request, file, subscriber_list=None, update_existing=False):
+    """Spool the upload to disk and queue the background import."""
+    job = ImportJob.objects.create(
+        owner=request.user,
+        subscriber_list=subscriber_list,
+        update_existing=update_existing,
+        file=file,
+        file_name=file.name,
+    )
+    transaction.on_commit(lambda: run_import_job.delay(str(job.pk)))
+    return job
+
+
+@login_required
 def import_subscriber_lists(request):
-    if request.method == 'POST' and request.FILES.get('file'):
-        file = request.FILES['file']
-
-        try:
-            # Read the Excel file into a DataFrame
-            df = pd.read_excel(file)
-
-            # Iterate over each row in the DataFrame
-            for index, row in df.iterrows():
-                email = row.get('email')
-                first_name = row.get('first_name', '')
-                last_name = row.get('last_name', '')
-                is_active = row.get('is_active', True)
-                list_names = row.get('lists', '').split(',')  # Assuming lists are comma-separated in the file
-
-                if email:
-                    # Create or update the subscriber
-                    subscriber, created = Subscriber.objects.get_or_create(email=email, defaults={
-                        'first_name': first_name,
-                        'last_name': last_name,
-                        'is_active': is_active
-                    })
-
-                    if not created:
-                        # Update existing subscriber if needed
-                        subscriber.first_name = first_name
-                        subscriber.last_name = last_name
-                        subscriber.is_active = is_active
-                        subscriber.save()
-
-                    # Process the subscriber's lists
-                    for list_name in list_names:
-                        list_name = list_name.strip()  # Clean up any spaces around the names
-                        if list_name:
-                            # Get or create the SubscriberList object
-                            subscriber_list, created = SubscriberList.objects.get_or_create(name=list_name)
-
-                            # Add the subscriber to the list
-                            subscriber.lists.add(subscriber_list)
-
-            messages.success(request, "Subscribers imported successfully.")
-        except Exception as e:
-            messages.error(request, f"Error importing subscribers: {str(e)}")
+    # The import page posts "file", the modal on the subscriber form "csv_file".
+    file = request.FILES.get('file') or request.FILES.get('csv_file')
+    if request.method == 'POST' and file:
+        if not file.name.lower().endswith(IMPORT_EXTENSIONS):
+            messages.error(request, "Please upload a .csv or .xlsx file.")
+            return redirect('subscriber:subscriber_list')
+
+        # Columns: email, first_name, last_name, is_active, lists (comma-separated list names)
+        job = start_import_job(request, file, update_existing=True)
+        messages.success(request, f"Importing {file.name} in the background.")
+        return redirect('subscriber:import_job_detail', pk=job.pk)
 
     return redirect('subscriber:subscriber_list')  # Redirect to the subscriber list page
 
 
+class ImportJobDetailView(LoginRequiredMixin, DetailView):
+    model = ImportJob
+    template_name = 'subscribers/import_job.html'
+    context_object_name = 'job'
 
-def export_subscribers(request):
-    # Query all subscribers
-    subscribers = Subscriber.objects.all()
-
-    # Prepare data for Excel
-    data = []
-    for subscriber in subscribers:
-        data.append({
+    def get_queryset(self):
+        return ImportJob.objects.filter(owner=self.request.user).select_related('subscriber_list')
+
+
+@login_required
+def import_job_progress(request, pk):
+    """Progress of an import job as JSON, polled by the job page."""
+    job = get_object_or_404(ImportJob, pk=pk, owner=request.user)
+    return JsonResponse(job.get_progress_data())
+
+
+@login_required
+def subscriber_search(request):
+    """Subscribers matching ``q``, best matches first, one keyset page at a time."""
+    try:
+        limit = min(max(int(request.GET.get('limit', 25)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return HttpResponseBadRequest("limit must be a number")
+    try:
+        page = search_subscribers(request.GET.get('q', ''), request.GET.get('cursor'), limit)
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    return JsonResponse({
+        'results': [{
+            'pk': subscriber.pk,
             'email': subscriber.email,
             'first_name': subscriber.first_name,
             'last_name': subscriber.last_name,
             'is_active': subscriber.is_active,
-            'subscribed_at': subscriber.subscribed_at.strftime('%Y-%m-%d %H:%M:%S') if subscriber.subscribed_at else '',
-            'unsubscribed_at': subscriber.unsubscribed_at.strftime('%Y-%m-%d %H:%M:%S') if subscriber.unsubscribed_at else '',
-            'lists': ', '.join(list.name for list in subscriber.lists.all()),  # many-to-many field
-        })
-
-    # Create a DataFrame
-    df = pd.DataFrame(data)
+            'url': reverse('subscriber:subscriber_update', args=[subscriber.pk]),
+        } for subscriber in page.results],
+        'next': page.next,
+    })
 
-    # Create the HTTP response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename=subscribers_export.xlsx'
 
-    # Write Excel file
-    with pd.ExcelWriter(response, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
+def export_subscribers(request):
+    file_format = _export_format(request)
+    if file_format is None:
+        return HttpResponseBadRequest(f"Unsupported export format; use one of: {', '.join(EXPORT_FORMATS)}")
 
-    return response
+    # Same columns the importer reads, so an export can be imported again.
+    columns = [(key, key) for key in (
+        'email', 'first_name', 'last_name', 'is_active', 'subscribed_at', 'unsubscribed_at', 'lists'
+    )]
+    return export_response(export_rows(), columns, 'subscribers_export', file_format)
 
 
 
+@login_required
 def subscriber_import_view(request, list_id):
     subscriber_list = get_object_or_404(SubscriberList, id=list_id)
 
     if request.method == 'POST':
         form = SubscriberImportForm(request.POST, request.FILES)
         if form.is_valid():
-            excel_file = request.FILES['excel_file']
-            try:
-                # Read the Excel file using pandas
-                df = pd.read_excel(excel_file)
-
-                # Expecting columns: email, first_name, last_name
-                required_columns = ['email', 'first_name', 'last_name']
-                if not all(column in df.columns for column in required_columns):
-                    messages.error(request, f'Excel must have columns: {", ".join(required_columns)}')
-                    return redirect('subscriber:subscriber_import', list_id=subscriber_list.id)
-
-                imported_count = 0
-
-                for _, row in df.iterrows():
-                    email = row['email']
-                    first_name = row.get('first_name', '')
-                    last_name = row.get('last_name', '')
-
-                    subscriber, created = Subscriber.objects.get_or_create(
-                        email=email,
-                        defaults={
-                            'first_name': first_name,
-                            'last_name': last_name,
-                            'is_active': True,
-                        }
-                    )
-                    # Add to list if not already added
-                    subscriber.lists.add(subscriber_list)
-                    imported_count += 1
-
-                messages.success(request, f"Successfully imported {imported_count} subscribers.")
-                return redirect('subscriber:subscriberlist_list')
-
-            except Exception as e:
-                messages.error(request, f"Error processing file: {e}")
+            # Columns: email, first_name, last_name
+            job = start_import_job(request, form.cleaned_data['excel_file'], subscriber_list=subscriber_list)
+            messages.success(request, f"Importing subscribers into {subscriber_list.name} in the background.")
+            return redirect('subscriber:import_job_detail', pk=job.pk)
 
     else:
         form = SubscriberImportForm()
@@ -207,12 +187,78 @@ class UnsubscribeView(TemplateView):
             print(f"BadSignature error: {str(e)}")
             messages.error(request, 'Invalid or expired unsubscribe link. Please contact support.')
         return redirect('core:home')
-    
 
-class SubscriberListView(LoginRequiredMixin, ListView):
-    model = Subscriber
+
+class TokenUnsubscribeView(View):
+    """
+    Unsubscribe link used in campaign mail. The token is checked without
+    touching the database and the subscriber is deactivated with a single
+    UPDATE; the unsubscribe is counted against the campaign through the
+    tracking event buffer.
+    """
+
+    def get(self, request, campaign_id, token):
+        subscriber_id = check_unsubscribe_token(campaign_id, token)
+        if subscriber_id is None:
+            messages.error(request, 'Invalid unsubscribe link. Please contact support.')
+            return redirect('core:home')
+
+        unsubscribed = Subscriber.objects.filter(pk=subscriber_id, is_active=True).update(
+            is_active=False,
+            unsubscribed_at=timezone.now()
+        )
+        if unsubscribed:
+            record_event(campaign_id, subscriber_id, 'unsubscribed', request)
+        messages.success(request, 'You have been unsubscribed.')
+        return redirect('core:home')
+
+
+class SubscriberListView(LoginRequiredMixin, TemplateView):
+    """Table shell; rows are loaded page by page from ``SubscriberTableView``."""
     template_name = 'subscribers/subscriber_list.html'
-    context_object_name = 'subscribers'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['lists'] = SubscriberList.objects.filter(is_active=True).order_by('name').values('pk', 'name')
+        return context
+
+
+class SubscriberTableView(CursorTableView):
+    model = Subscriber
+    fields = ('email', 'first_name', 'last_name', 'is_active', 'subscribed_at', 'list_names')
+    sort_fields = {'email': 'email', 'subscribed': 'subscribed_at'}
+    default_sort = '-subscribed'
+
+    def get_queryset(self):
+        # Aggregated per row of the page, not grouped over the whole table.
+        list_names = Subscriber.lists.through.objects.filter(
+            subscriber_id=OuterRef('pk')
+        ).order_by().values('subscriber_id').annotate(names=ListNames('subscriberlist__name')).values('names')
+        return Subscriber.objects.annotate(list_names=Subquery(list_names))
+
+    def search(self, queryset, query):
+        return queryset.filter(pk__in=matching_subscribers(query))
+
+    def filter_queryset(self, queryset):
+        status = self.request.GET.get('status')
+        if status in ('active', 'unsubscribed'):
+            queryset = queryset.filter(is_active=status == 'active')
+        list_id = self.request.GET.get('list')
+        if list_id:
+            try:
+                queryset = queryset.filter(pk__in=Subscriber.lists.through.objects.filter(
+                    subscriberlist_id=uuid.UUID(list_id)
+                ).values('subscriber_id'))
+            except ValueError:
+                pass
+        return queryset
+
+    def serialize_row(self, row):
+        row['urls'] = {
+            'update': reverse('subscriber:subscriber_update', args=[row['pk']]),
+            'delete': reverse('subscriber:subscriber_delete', args=[row['pk']]),
+        }
+        return row
 
 
 class SubscriberCreateView(LoginRequiredMixin, CreateView):
@@ -237,13 +283,34 @@ class SubscriberDeleteView(LoginRequiredMixin, DeleteView):
 
 from subscribers.models import SubscriberList
 
-class SubscriberListListView(LoginRequiredMixin, ListView):
-    model = SubscriberList
+class SubscriberListListView(LoginRequiredMixin, TemplateView):
+    """Table shell; rows are loaded page by page from ``SubscriberListTableView``."""
     template_name = 'subscribers/subscriberlist_list.html'
-    context_object_name = 'lists'
+
+
+class SubscriberListTableView(CursorTableView):
+    model = SubscriberList
+    fields = ('name', 'description', 'is_active', 'created_at', 'subscriber_count')
+    sort_fields = {'name': 'name', 'created': 'created_at'}
+    default_sort = '-created'
+    search_fields = ('name', 'description')
 
     def get_queryset(self):
-        return SubscriberList.objects.filter(is_active=True)
+        # Counted per row of the page through the membership index, not for every list.
+        memberships = Subscriber.lists.through.objects.filter(
+            subscriberlist_id=OuterRef('pk')
+        ).order_by().values('subscriberlist_id').annotate(total=Count('pk')).values('total')
+        return SubscriberList.objects.filter(is_active=True).annotate(
+            subscriber_count=Coalesce(Subquery(memberships), 0)
+        )
+
+    def serialize_row(self, row):
+        row['urls'] = {
+            'update': reverse('subscriber:subscriberlist_update', args=[row['pk']]),
+            'delete': reverse('subscriber:subscriberlist_delete', args=[row['pk']]),
+            'import': reverse('subscriber:subscriber_import', kwargs={'list_id': row['pk']}),
+        }
+        return row
 
 
 class SubscriberListCreateView(LoginRequiredMixin, CreateView):
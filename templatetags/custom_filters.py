@@ -1,26 +1,20 @@
 
 import re
-import json
 from django import template
 from django.utils.safestring import mark_safe
 
+from utils.quill import quill_html
+
 register = template.Library()
 
 @register.filter
 def quill_delta_to_html(value):
-    try:
-        # Handle both string JSON and FieldQuill objects
-        delta_str = value if isinstance(value, str) else value.json
-        delta = json.loads(delta_str)
-        
-        html = []
-        for op in delta.get('ops', []):
-            if 'insert' in op:
-                text = op['insert']
-                # ... rest of your existing conversion logic ...
-        return mark_safe(''.join(html))
-    except (json.JSONDecodeError, AttributeError, TypeError) as e:
-        return f"Error rendering content: {str(e)}"
+    """
+    Render Quill content (a QuillField value, its JSON or a delta) as HTML.
+    Conversions are cached by content hash, see ``utils.quill``.
+    Usage: {{ campaign.content|quill_delta_to_html }}
+    """
+    return mark_safe(quill_html(value))
 
 
 @register.filter
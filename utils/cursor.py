@@ -0,0 +1,126 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.views import View
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder rounds to milliseconds; a cursor needs the exact value.
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=_CursorEncoder).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, fields):
+    """The sort key values of ``cursor``, converted back with ``fields``."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise InvalidCursor(cursor)
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        raise InvalidCursor(cursor)
+
+
+class CursorTableView(LoginRequiredMixin, View):
+    """
+    JSON endpoint serving one keyset page of a table.
+
+    Rows are ordered by the requested sort column and then by primary key,
+    and the next page starts after the last row of this one
+    (``WHERE (sort, pk) > (last_sort, last_pk)``), so every page costs the
+    same however deep the user goes. Only ``fields`` are selected.
+
+    Query parameters: ``sort`` (a key of ``sort_fields``, ``-`` prefix for
+    descending), ``q`` (matched against ``search_fields``), ``cursor`` (the
+    ``next`` value of the previous page), ``page_size`` and whatever
+    ``filter_queryset`` reads.
+    """
+    model = None
+    fields = ()
+    # Public sort key -> model field; sort fields must not be nullable.
+    sort_fields = {}
+    default_sort = None
+    search_fields = ()
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def filter_queryset(self, queryset):
+        return queryset
+
+    def search(self, queryset, query):
+        condition = Q()
+        for field in self.search_fields:
+            condition |= Q(**{f'{field}__icontains': query})
+        return queryset.filter(condition)
+
+    def serialize_row(self, row):
+        return row
+
+    def get(self, request, *args, **kwargs):
+        sort = request.GET.get('sort') or self.default_sort
+        descending = sort.startswith('-')
+        sort_field = self.sort_fields.get(sort.lstrip('-'))
+        if sort_field is None:
+            return HttpResponseBadRequest(f"Unknown sort: {sort}")
+        try:
+            page_size = min(max(int(request.GET.get('page_size', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return HttpResponseBadRequest("page_size must be a number")
+
+        queryset = self.filter_queryset(self.get_queryset())
+        query = request.GET.get('q', '').strip()
+        if query:
+            queryset = self.search(queryset, query)
+
+        keys = [sort_field, 'pk'] if sort_field != 'pk' else ['pk']
+        cursor = request.GET.get('cursor')
+        if cursor:
+            opts = self.model._meta
+            try:
+                values = decode_cursor(cursor, [opts.pk if key == 'pk' else opts.get_field(key) for key in keys])
+            except InvalidCursor:
+                return HttpResponseBadRequest("Invalid cursor")
+            queryset = queryset.filter(self._after(keys, values, descending))
+
+        ordering = [f'-{key}' if descending else key for key in keys]
+        rows = list(queryset.order_by(*ordering).values(*self.fields, *keys)[:page_size + 1])
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor([rows[-1][key] for key in keys])
+
+        return JsonResponse({
+            'results': [self.serialize_row(row) for row in rows],
+            'next': next_cursor,
+        })
+
+    @staticmethod
+    def _after(keys, values, descending):
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)
+        lookup = 'lt' if descending else 'gt'
+        condition = Q(**{f'{keys[-1]}__{lookup}': values[-1]})
+        for key, value in zip(reversed(keys[:-1]), reversed(values[:-1])):
+            condition = Q(**{f'{key}__{lookup}': value}) | (Q(**{key: value}) & condition)
+        return condition
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils.html import escape
+
+# Inline formats, innermost first.
+INLINE_TAGS = (
+    ('code', 'code'),
+    ('strike', 's'),
+    ('underline', 'u'),
+    ('italic', 'em'),
+    ('bold', 'strong'),
+)
+
+LIST_TAGS = {'ordered': 'ol', 'bullet': 'ul'}
+
+# Link schemes allowed in the HTML; campaigns.links tracks the http(s) ones.
+LINK_SCHEMES = ('http', 'https', 'mailto')
+
+# Browsers ignore these inside a URL, so "java\tscript:" is still javascript:.
+_URL_IGNORED_RE = re.compile(r'[\x00-\x20\x7f]')
+
+
+def _safe_link(url):
+    """``url`` if its scheme is in ``LINK_SCHEMES``, else ``None``."""
+    url = str(url).strip()
+    try:
+        scheme = urlsplit(_URL_IGNORED_RE.sub('', url)).scheme.lower()
+    except ValueError:
+        return None
+    return url if scheme in LINK_SCHEMES else None
+
+
+def _render_inline(text, attributes):
+    html = escape(text)
+    for name, tag in INLINE_TAGS:
+        if attributes.get(name):
+            html = f"<{tag}>{html}</{tag}>"
+    if attributes.get('script') in ('sub', 'super'):
+        tag = 'sub' if attributes['script'] == 'sub' else 'sup'
+        html = f"<{tag}>{html}</{tag}>"
+
+    styles = []
+    if attributes.get('color'):
+        styles.append(f"color: {attributes['color']}")
+    if attributes.get('background'):
+        styles.append(f"background-color: {attributes['background']}")
+    if styles:
+        html = f'<span style="{escape("; ".join(styles))}">{html}</span>'
+
+    link = _safe_link(attributes['link']) if attributes.get('link') else None
+    if link:
+        html = f'<a href="{escape(link)}" target="_blank">{html}</a>'
+    return html
+
+
+def _render_embed(embed, attributes):
+    if isinstance(embed, dict) and embed.get('image'):
+        alt = f' alt="{escape(attributes["alt"])}"' if attributes.get('alt') else ''
+        return f'<img src="{escape(embed["image"])}"{alt}>'
+    return ''
+
+
+def _block_classes(attributes):
+    classes = []
+    if attributes.get('align'):
+        classes.append(f"ql-align-{attributes['align']}")
+    if attributes.get('indent'):
+        classes.append(f"ql-indent-{int(attributes['indent'])}")
+    return f' class="{escape(" ".join(classes))}"' if classes else ''
+
+
+def delta_to_html(delta):
+    """
+    Convert a Quill delta (``{"ops": [...]}``, a list of ops or their JSON)
+    into the HTML the Quill editor produces for it.
+    """
+    if isinstance(delta, str):
+        delta = json.loads(delta) if delta.strip() else {}
+    ops = delta.get('ops', []) if isinstance(delta, dict) else delta or []
+
+    blocks = []
+    line = []
+    for op in ops:
+        insert = op.get('insert')
+        attributes = op.get('attributes') or {}
+        if not isinstance(insert, str):
+            line.append(_render_embed(insert, attributes))
+            continue
+
+        segments = insert.split('\n')
+        for index, segment in enumerate(segments):
+            if index:
+                # Block formats live on the newline that ends the line.
+                blocks.append((''.join(line), attributes))
+                line = []
+            if segment:
+                line.append(_render_inline(segment, attributes))
+    if line:
+        blocks.append((''.join(line), {}))
+
+    html = []
+    open_list = None
+    for content, attributes in blocks:
+        content = content or '<br>'
+        list_tag = LIST_TAGS.get(attributes.get('list'))
+        if list_tag != open_list:
+            if open_list:
+                html.append(f"</{open_list}>")
+            if list_tag:
+                html.append(f"<{list_tag}>")
+            open_list = list_tag
+
+        classes = _block_classes(attributes)
+        if list_tag:
+            html.append(f"<li{classes}>{content}</li>")
+        elif attributes.get('header'):
+            level = min(max(int(attributes['header']), 1), 6)
+            html.append(f"<h{level}{classes}>{content}</h{level}>")
+        elif attributes.get('blockquote'):
+            html.append(f"<blockquote{classes}>{content}</blockquote>")
+        elif attributes.get('code-block'):
+            html.append(f'<pre class="ql-syntax" spellcheck="false">{content}</pre>')
+        else:
+            html.append(f"<p{classes}>{content}</p>")
+    if open_list:
+        html.append(f"</{open_list}>")
+    return ''.join(html)
+
+
+class QuillHTMLCache:
+    """
+    Bounded LRU of rendered HTML keyed by a hash of the Quill JSON, so each
+    distinct piece of content is parsed and converted once per process.
+    Entries are dropped when the object that owned them is saved or deleted.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # owner -> keys, and key -> owners, so evicting an entry also
+        # forgets it in its owners and neither map outgrows the LRU.
+        self._owners = {}
+        self._key_owners = {}
+
+    @staticmethod
+    def key(json_string):
+        return hashlib.sha1(json_string.encode('utf-8')).hexdigest()
+
+    def get(self, json_string, owner=None):
+        key = self.key(json_string)
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self._link(key, owner)
+        if html is None:
+            html = self._render(json_string)
+            with self._lock:
+                self._entries[key] = html
+                self._link(key, owner)
+                while len(self._entries) > self.max_entries:
+                    self._evict(next(iter(self._entries)))
+        return html
+
+    def _link(self, key, owner):
+        if owner is not None:
+            self._owners.setdefault(owner, set()).add(key)
+            self._key_owners.setdefault(key, set()).add(owner)
+
+    def _evict(self, key):
+        self._entries.pop(key, None)
+        for owner in self._key_owners.pop(key, ()):
+            keys = self._owners.get(owner)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._owners[owner]
+
+    @staticmethod
+    def _render(json_string):
+        try:
+            data = json.loads(json_string)
+        except (json.JSONDecodeError, TypeError):
+            return ''
+        if not isinstance(data, dict):
+            return delta_to_html(data)
+        # The editor stores its own HTML next to the delta; only convert
+        # the delta when that is missing.
+        return data.get('html') or delta_to_html(data.get('delta') or {})
+
+    def invalidate(self, owner):
+        with self._lock:
+            for key in list(self._owners.get(owner, ())):
+                self._evict(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._owners.clear()
+            self._key_owners.clear()
+
+
+cache = QuillHTMLCache(getattr(settings, 'QUILL_HTML_CACHE_SIZE', 256))
+
+
+def _owner_of(instance):
+    return (instance._meta.label, instance.pk)
+
+
+def quill_html(value):
+    """
+    HTML for a ``QuillField`` value, a Quill JSON string or a delta,
+    served from the content-hash cache.
+    """
+    if value is None:
+        return ''
+    if hasattr(value, 'json_string'):
+        owner = _owner_of(value.instance) if getattr(value, 'instance', None) is not None else None
+        return cache.get(value.json_string, owner)
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, sort_keys=True)
+    return cache.get(value)
+
+
+def invalidate_quill_html(sender, instance, **kwargs):
+    """``post_save``/``post_delete`` receiver for models with Quill content."""
+    cache.invalidate(_owner_of(instance))
@@ -1,5 +1,8 @@
 import re
-from .models import Subscriber, EmailListSubscriber
+
+import pandas as pd
+
+from subscribers.importer import SubscriberImporter
 
 def parse_subscriber_data(data):
     """
@@ -35,26 +38,7 @@ def add_subscribers_to_list(email_list, subscribers):
     Add multiple subscribers to an email list
     Returns tuple of (added_count, duplicate_count)
     """
-    added = 0
-    duplicates = 0
-    
-    for sub_data in subscribers:
-        subscriber, created = Subscriber.objects.get_or_create(
-            email=sub_data['email'],
-            defaults={
-                'first_name': sub_data.get('first_name', ''),
-                'last_name': sub_data.get('last_name', '')
-            }
-        )
-        
-        if created:
-            added += 1
-        else:
-            duplicates += 1
-            
-        EmailListSubscriber.objects.get_or_create(
-            email_list=email_list,
-            subscriber=subscriber
-        )
-    
-    return (added, duplicates)
\ No newline at end of file
+    result = SubscriberImporter(subscriber_list=email_list).import_frame(
+        pd.DataFrame(subscribers, columns=['email', 'first_name', 'last_name'])
+    )
+    return (result.added, result.skipped + result.duplicates)